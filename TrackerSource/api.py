@@ -0,0 +1,312 @@
+"""HTTP API beside the Streamlit UI, for scripts that read or bulk-load the tracker.
+
+    python api.py --port 8502
+
+    GET  /api/tracker?homologated=Passed&request=R-12&after=0&limit=500
+    POST /api/tracker        a JSON array (or NDJSON) of row objects
+
+Reads are paged by ID: pass the previous page's next_after as after. They
+come as JSON, or as NDJSON with ?format=ndjson or Accept: application/x-ndjson
+(all matching rows, streamed, unless limit is given). Every response carries
+the tracker revision as a strong ETag: If-None-Match answers 304 while the table
+is unchanged, and an If-Match upsert fails with 412 once it has changed (weak
+W/ tags never match it, If-Match compares strongly).
+Responses are gzipped for clients that accept it. With TRACKER_API_TOKEN set,
+requests need "Authorization: Bearer <token>".
+"""
+import argparse
+import gzip
+import hmac
+import json
+import os
+import zlib
+from contextlib import ExitStack
+
+import bottle
+from bottle import HTTPResponse, request
+
+from database import SEARCH_COLUMNS, StaleRevisionError, build_tracker_filter, get_connection_manager, table_revision
+from excel_import import ImportValidationError, import_records
+from profiling import count, span, timed
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+NDJSON = "application/x-ndjson"
+# Smaller bodies are sent as they are, gzip would barely shrink them
+GZIP_MIN_BYTES = 1024
+STREAM_BATCH = 1000
+
+app = bottle.Bottle()
+
+
+def _error(status: int, message: str, headers=None, **extra) -> HTTPResponse:
+    body = json.dumps({"error": message, **extra}, ensure_ascii=False)
+    return HTTPResponse(body, status, headers, content_type="application/json")
+
+
+def _etag(revision: int) -> str:
+    return f'"{revision}"'
+
+
+def _revisions(header: str, weak: bool = True):
+    """Revisions listed in an If-None-Match/If-Match header; None stands for *.
+
+    If-None-Match compares weakly (a W/ tag matches too), If-Match strongly
+    (weak=False skips W/ tags), as RFC 9110 requires.
+    """
+    revisions = set()
+    for tag in (header or "").split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return None
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        try:
+            revisions.add(int(tag.strip('"')))
+        except ValueError:
+            continue  # another server's tag never matches
+    return revisions
+
+
+def _accepts_gzip() -> bool:
+    for coding in request.get_header("Accept-Encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _int_param(name: str, default=None, maximum: int = None, minimum: int = 0):
+    value = request.query.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise _error(400, f"{name} must be an integer")
+    if number < minimum:
+        raise _error(400, f"{name} must be at least {minimum}")
+    return min(number, maximum) if maximum else number
+
+
+@app.hook("before_request")
+def _authorize():
+    token = os.environ.get("TRACKER_API_TOKEN")
+    if not token:
+        return
+    supplied = request.get_header("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        raise _error(401, "missing or wrong bearer token", {"WWW-Authenticate": "Bearer"})
+
+
+def tracker_query(after: int, limit: int = None):
+    """SQL and parameters for one page of the rows the query string asks for.
+
+    homologated and request may repeat and match exactly; <column>_contains
+    searches a column of SEARCH_COLUMNS like the tracker page does.
+    """
+    # bottle keeps query values as latin-1 unless asked to decode them
+    query = request.query.decode()
+    filters = {column: query.get(f"{column.lower()}_contains") for column in SEARCH_COLUMNS}
+    filters["Homologated"] = query.getall("homologated")
+    where, params = build_tracker_filter(filters, get_connection_manager().use_fts)
+
+    clauses = [where[len("WHERE "):]] if where else []
+    requests = query.getall("request")
+    if requests:
+        clauses.append(f"Request IN ({', '.join('?' for _ in requests)})")
+        params.extend(requests)
+    clauses.append("ID > ?")
+    params.append(after)
+
+    sql = f"SELECT * FROM ValidationTracker WHERE {' AND '.join(clauses)} ORDER BY ID"
+    if limit is not None:
+        # One row past the page tells whether there is a next one
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    return sql, params
+
+
+def _read_snapshot(conn) -> int:
+    """Opens a read transaction and returns the revision its rows belong to.
+
+    The pool rolls it back when the connection is returned.
+    """
+    conn.execute("BEGIN")
+    row = conn.execute("SELECT revision FROM TableRevision WHERE name = 'ValidationTracker'").fetchone()
+    return row[0] if row else 0
+
+
+@app.get("/api/tracker")
+def read_tracker():
+    revision = table_revision()
+    matches = _revisions(request.get_header("If-None-Match"))
+    if matches is None or revision in matches:
+        return HTTPResponse(status=304, headers={"ETag": _etag(revision)})
+
+    accept = request.get_header("Accept", "")
+    ndjson = request.query.get("format") == "ndjson" or NDJSON in accept
+    limit = _int_param("limit", None if ndjson else DEFAULT_LIMIT, MAX_LIMIT, minimum=1)
+    query, params = tracker_query(_int_param("after", 0), limit)
+    if ndjson:
+        return _ndjson_rows(query, params, limit)
+    return _json_rows(query, params, limit)
+
+
+def _page(cursor, limit):
+    rows = cursor.fetchall()
+    next_after = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1][0] if rows else None
+    return rows, next_after
+
+
+@timed("api.rows")
+def _json_rows(query, params, limit):
+    with get_connection_manager().reader() as conn:
+        revision = _read_snapshot(conn)
+        cursor = conn.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        rows, next_after = _page(cursor, limit)
+    count(rows_read=len(rows))
+
+    body = json.dumps(
+        {"revision": revision, "rows": [dict(zip(columns, row)) for row in rows], "next_after": next_after},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    headers = {"ETag": _etag(revision), "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if _accepts_gzip() and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return HTTPResponse(body, 200, headers, content_type="application/json")
+
+
+def _ndjson_rows(query, params, limit):
+    """Streams the rows, one JSON object per line, from a single read snapshot.
+
+    A limited page is read up front, to know its X-Next-After before the body;
+    otherwise the rows are fetched in STREAM_BATCH batches while they are sent.
+    """
+    # Held until the body is sent, or closed unsent
+    checkout = ExitStack()
+    conn = checkout.enter_context(get_connection_manager().reader())
+    try:
+        revision = _read_snapshot(conn)
+        cursor = conn.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        page, next_after = None, None
+        if limit is not None:
+            page, next_after = _page(cursor, limit)
+            checkout.close()
+    except BaseException:
+        checkout.close()
+        raise
+
+    def batches():
+        if page is not None:
+            yield page
+            return
+        while True:
+            batch = cursor.fetchmany(STREAM_BATCH)
+            if not batch:
+                return
+            yield batch
+
+    gzipped = _accepts_gzip()
+
+    def body():
+        # Closing the generator (the client went away) also returns the connection
+        compressor = zlib.compressobj(5, zlib.DEFLATED, 31) if gzipped else None
+        try:
+            with span("api.stream"):
+                for batch in batches():
+                    count(rows_read=len(batch))
+                    chunk = "".join(
+                        json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in batch
+                    ).encode("utf-8")
+                    chunk = compressor.compress(chunk) if compressor else chunk
+                    if chunk:
+                        yield chunk
+                if compressor:
+                    yield compressor.flush()
+        finally:
+            checkout.close()
+
+    headers = {"ETag": _etag(revision), "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if next_after is not None:
+        headers["X-Next-After"] = str(next_after)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return HTTPResponse(body(), 200, headers, content_type=NDJSON)
+
+
+def _records(raw: bytes):
+    """Row objects of a JSON array or NDJSON body."""
+    text = raw.decode("utf-8-sig").strip()
+    if text.startswith("["):
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not all(isinstance(record, dict) for record in records):
+        raise ValueError("every row must be a JSON object")
+    return records
+
+
+@app.post("/api/tracker")
+@timed("api.upsert")
+def upsert_tracker():
+    """Upserts rows like a workbook import (see excel_import.import_records()).
+
+    Each row writes only the columns it has, the others keep their values.
+    """
+    expected = None
+    if request.get_header("If-Match"):
+        revisions = _revisions(request.get_header("If-Match"), weak=False)
+        if revisions is not None:
+            if not revisions:
+                # Only weak or foreign tags, none can match strongly
+                raise _error(412, "If-Match names no strong tracker ETag", {"ETag": _etag(table_revision())})
+            if len(revisions) != 1:
+                raise _error(400, "If-Match must name one tracker revision")
+            expected = revisions.pop()
+
+    raw = request.body.read()
+    try:
+        if request.get_header("Content-Encoding", "").lower() == "gzip":
+            raw = gzip.decompress(raw)
+        records = _records(raw)
+    except (OSError, EOFError, UnicodeDecodeError, ValueError) as e:
+        raise _error(400, f"unreadable body: {e}")
+    if not records:
+        raise _error(400, "no rows in the body")
+
+    try:
+        result = import_records(records, source="api", expected_revision=expected)
+    except StaleRevisionError as e:
+        raise _error(412, str(e), {"ETag": _etag(table_revision())})
+    except ImportValidationError as e:
+        raise _error(422, str(e), errors=e.errors)
+
+    revision = table_revision()
+    body = json.dumps({"revision": revision, **result}, ensure_ascii=False)
+    return HTTPResponse(body, 200, {"ETag": _etag(revision)}, content_type="application/json")
+
+
+def main(argv=None):
+    from werkzeug.serving import run_simple
+
+    parser = argparse.ArgumentParser(description="Serve the tracker's HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    # Brings the schema up to date before the first request
+    get_connection_manager()
+    run_simple(args.host, args.port, app, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
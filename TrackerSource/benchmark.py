@@ -0,0 +1,252 @@
+"""Headless benchmark of the tracker's hot paths on synthetic data.
+
+    python benchmark.py                          # 1k, 10k, 100k and 1M rows
+    python benchmark.py --sizes 1000 10000 --out bench.json
+    python benchmark.py --compare bench.json     # fails if a path got slower
+
+Every size runs against a fresh database in a temporary folder, never the
+real project_tracker.db. Each path is timed once on its own and, unless
+--no-memory is given, run again under tracemalloc for its peak memory.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import database
+from dashboard import read_rollups
+from database import HOMOLOGATION_OPTIONS, apply_changes, bump_revision, get_data_from_db, update_data
+from metrics import status_counts
+from report_builder import build_report, report_from_tracker_row
+from storage import DEFAULT_DATABASE
+from tracker_diff import diff_frames
+from tracker_export import WRITERS, iter_batches
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+PAGE_SIZE = 100
+REPEATS = 5
+REPEAT_BELOW = 0.1
+# Paths faster than this in both runs are not compared: the difference is noise
+COMPARE_FLOOR = 0.005
+SEED = 2025
+# Share of each status in the real tracker; None is a row nobody triaged yet
+STATUS_WEIGHTS = {
+    None: 9, "⏳AWAIT R&D": 7, "⚙️ FACTORY": 6, "✅ PASSED": 2, "❌ FAILED": 6, "🆘PRODUCT N/A": 11,
+    "📋.DOC": 22, "📡 EMC RADIATED": 2, "⚡ EMC CONDUCTED": 1, "🔍GOT PRODUCT": 3, "🛠️FUNCTION": 2,
+}
+VENDORS = ("Infineon", "Nexperia", "WeEn", "Vishay", "onsemi", "ROHM", "Murata", "TDK")
+PARTS = ("MOS N 100V", "SiC Schottky diode", "Inductor 10uH", "Connector 2x8", "Capacitor 470uF", "DC-DC 24V")
+PRODUCTS = ("CRS-2000 6959 48/24V", "ODS-3000 7156", "EDS-500 12V", "CBS-10K", "ODX 1300 7445")
+
+
+def synthetic_rows(count: int, seed: int = SEED):
+    """Yields tracker rows shaped like the real ones (Request '<year>-<n>_<códigos>')."""
+    rng = random.Random(seed)
+    statuses = [status for status in STATUS_WEIGHTS if status is None or status in HOMOLOGATION_OPTIONS]
+    weights = [STATUS_WEIGHTS[status] for status in statuses]
+    start = datetime(2025, 1, 1)
+    for n in range(count):
+        request = f"{2024 + n % 3}-{n // 3:06d}_{rng.randrange(10**7, 10**8)}"
+        priority = start + timedelta(days=rng.randrange(365)) if rng.random() < 0.3 else None
+        yield (
+            request,
+            priority.strftime("%Y-%m-%d %H:%M:%S") if priority else None,
+            rng.choices(statuses, weights)[0],
+            f"{rng.choice(VENDORS)} {rng.choice(PARTS)} {rng.randrange(1000, 9999)}",
+            f"{rng.choice(VENDORS)} {rng.choice(PARTS)} {rng.randrange(1000, 9999)}",
+            " | ".join(rng.sample(PRODUCTS, rng.randrange(1, 3))),
+            f"T{rng.randrange(1, 60)}" if rng.random() < 0.5 else None,
+            "awaiting final decision from R&D" if rng.random() < 0.4 else None,
+        )
+
+
+def seed_database(count: int):
+    manager = database.get_connection_manager()
+    with manager.transaction(source="benchmark") as conn:
+        conn.executemany(
+            "INSERT INTO ValidationTracker (Request, Priority, Homologated, Current, New, Product, Position, Note)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            synthetic_rows(count),
+        )
+        bump_revision(conn)
+
+
+def measure(fn, memory: bool):
+    """(seconds, peak MiB or None, result) of a call.
+
+    Calls faster than REPEAT_BELOW seconds are repeated up to REPEATS times
+    and the best time is kept, so millisecond paths are not lost in noise.
+    """
+    timings = []
+    while True:
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+        if timings[0] >= REPEAT_BELOW or len(timings) >= REPEATS:
+            break
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def edit_page_changes():
+    """What saving one edited editor page writes: diff the page, then apply the ChangeSet."""
+    original = get_data_from_db(f"SELECT * FROM ValidationTracker ORDER BY ID LIMIT {PAGE_SIZE}")
+    edited = original.copy()
+    edited.loc[edited.index[::10], "Note"] = f"benchmark {time.perf_counter()}"
+    changes = diff_frames(original, edited)
+    apply_changes(changes, source="benchmark")
+    return len(changes)
+
+
+def export(extension):
+    def run():
+        out = io.BytesIO()
+        with database.get_connection_manager().reader() as conn:
+            WRITERS[extension](iter_batches(conn), out)
+        return out.tell()
+    return run
+
+
+def benchmark_paths(size: int):
+    """(name, callable) of each measured path, in an order where writes come last."""
+    nonce = iter(range(10**9))
+    reports = [
+        report_from_tracker_row(dict(zip(("Request", "Current", "New", "Product", "Homologated"), row)))
+        for row in get_data_from_db(
+            "SELECT Request, Current, New, Product, Homologated FROM ValidationTracker LIMIT 20"
+        ).itertuples(index=False, name=None)
+    ]
+    build_report(reports[0])  # the report template is built once per process, keep it out of the timings
+    paths = [
+        ("load_all", lambda: len(get_data_from_db("SELECT * FROM ValidationTracker"))),
+        ("load_page", lambda: len(get_data_from_db(
+            *database.search_tracker_query({}, sort_by="Priority", limit=PAGE_SIZE, offset=size // 2)
+        ))),
+        ("filter_text", lambda: len(get_data_from_db(
+            *database.search_tracker_query({"Product": "CRS-2000", "Note": "R&D"}, limit=PAGE_SIZE)
+        ))),
+        # terms under 3 characters cannot use the trigram index and fall back to LIKE
+        ("filter_short_text", lambda: len(get_data_from_db(
+            *database.search_tracker_query({"Request": "_1"}, limit=PAGE_SIZE)
+        ))),
+        ("filter_status", lambda: len(get_data_from_db(
+            *database.search_tracker_query({"Homologated": ["✅ PASSED", "❌ FAILED"]}, limit=PAGE_SIZE)
+        ))),
+        ("count_filtered", lambda: get_data_from_db(
+            *database.count_tracker_query({"Product": "ODS"})
+        )["n"].iloc[0]),
+        # a fresh revision each call, so the st.cache_data entry is always a miss
+        ("metrics", lambda: sum(status_counts("", (), -next(nonce) - 1).values())),
+        ("dashboard", lambda: sum(len(frame) for frame in read_rollups(-next(nonce) - 1).values())),
+        ("export_csv", export("csv")),
+        ("export_xlsx", export("xlsx")),
+    ]
+    try:
+        import pyarrow  # noqa: F401
+        paths.append(("export_parquet", export("parquet")))
+    except ImportError:
+        pass
+    return paths + [
+        ("generate_doc", lambda: sum(len(build_report(report)) for report in reports)),
+        ("save_page", edit_page_changes),
+        ("update_data", lambda: update_data(get_data_from_db("SELECT * FROM ValidationTracker")) or size),
+    ]
+
+
+def run_size(size: int, memory: bool, log=print):
+    results = []
+    db_name = database.DB_NAME
+    with tempfile.TemporaryDirectory(prefix="tracker_bench_") as folder:
+        # Every default connection (and DB_PATH) now points at the temporary folder
+        database.DB_NAME = os.path.join(folder, DEFAULT_DATABASE)
+        database.open_database.clear()
+        try:
+            seconds, _, _ = measure(lambda: seed_database(size), memory=False)
+            results.append({"size": size, "path": "seed", "seconds": seconds, "peak_mib": None, "result": size})
+            log(f"{size:>9,} rows  {'seed':<18} {seconds:9.3f}s")
+            for name, fn in benchmark_paths(size):
+                seconds, peak, result = measure(fn, memory)
+                results.append({"size": size, "path": name, "seconds": seconds, "peak_mib": peak, "result": int(result)})
+                log(f"{size:>9,} rows  {name:<18} {seconds:9.3f}s" + (f"  {peak:8.1f} MiB" if peak is not None else ""))
+        finally:
+            database.get_connection_manager().close()
+            database.open_database.clear()
+            database.DB_NAME = db_name
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_file: str, tolerance: float):
+    """Prints the slowdown of each path against a previous run; returns the regressions."""
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = {(r["size"], r["path"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["size"], result["path"]))
+        if not before or max(before["seconds"], result["seconds"]) < COMPARE_FLOOR:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        flag = ""
+        if ratio > tolerance:
+            regressions.append(result)
+            flag = "  <-- slower"
+        print(f"{result['size']:>9,} rows  {result['path']:<18} x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tracker load, filter, save, export and report paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="tracker sizes in rows")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON file to write")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (halves the run time)")
+    parser.add_argument("--compare", metavar="JSON", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, memory=not args.no_memory))
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.out}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
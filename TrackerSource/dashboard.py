@@ -0,0 +1,136 @@
+import re
+from datetime import date, timedelta
+from typing import Dict
+
+import pandas as pd
+import streamlit as st
+
+from database import get_data_from_db, table_revision
+from metrics import STATUS_BUCKETS
+from profiling import timed
+
+# Statuses that end a homologation; every other one is still open and ages
+CLOSED_STATUSES = [status for status, bucket in STATUS_BUCKETS.items() if bucket in ("passed", "failed")]
+NO_STATUS = "(no status)"
+TOP_PRODUCTS = 12
+# Upper bound in weeks past Priority of each aging bucket
+AGE_BUCKETS = ((0, "not due"), (1, "< 1 week"), (2, "1-2 weeks"), (4, "2-4 weeks"), (8, "1-2 months"), (None, "> 2 months"))
+
+# "ODS3000 7157TV", "ODS-3000 7156" and "ods 3000" are all the ODS-3000 family
+PRODUCT_FAMILY = re.compile(r"^\s*([A-Za-z]+)[\s-]?(\d+)")
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def read_rollups(revision: int) -> Dict[str, pd.DataFrame]:
+    """The trigger-maintained rollup tables, re-read once per tracker revision."""
+    return {
+        "daily": get_data_from_db("SELECT Day, Status, Entered, Exited FROM StatusDaily ORDER BY Day"),
+        "product": get_data_from_db("SELECT Product, Status, Rows FROM ProductStatus WHERE Rows > 0"),
+        "priority": get_data_from_db("SELECT Week, Status, Rows FROM PriorityWeek WHERE Rows > 0"),
+    }
+
+
+def product_family(product: str) -> str:
+    match = PRODUCT_FAMILY.match(product or "")
+    if match:
+        return f"{match.group(1).upper()}-{match.group(2)}"
+    return product.strip() or "(no product)"
+
+
+def status_over_time(daily: pd.DataFrame) -> pd.DataFrame:
+    """Rows in each status at the end of every day with a change."""
+    net = (daily["Entered"] - daily["Exited"]).groupby([daily["Day"], daily["Status"]]).sum()
+    return net.unstack(fill_value=0).sort_index().cumsum()
+
+
+def weekly_throughput(daily: pd.DataFrame) -> pd.DataFrame:
+    """Net rows that reached a closing status, per week.
+
+    Net of exits, so a table replaced by a restore does not count as closures.
+    The first day holds the statuses from before the ChangeLog and is left out.
+    """
+    closed = daily[daily["Status"].isin(CLOSED_STATUSES) & (daily["Day"] > daily["Day"].min())]
+    weeks = pd.to_datetime(closed["Day"]).dt.to_period("W").dt.start_time.rename("Week")
+    net = (closed["Entered"] - closed["Exited"]).rename("Closed")
+    return net.groupby([weeks, closed["Status"]]).sum().clip(lower=0).reset_index()
+
+
+def rows_per_product(product: pd.DataFrame, top: int = TOP_PRODUCTS) -> pd.DataFrame:
+    """Rows per product family and status; a row listing several products counts for each."""
+    exploded = product.assign(Family=product["Product"].str.split("|")).explode("Family")
+    exploded["Family"] = exploded["Family"].map(product_family)
+    families = exploded.groupby(["Family", "Status"], as_index=False)["Rows"].sum()
+    leaders = families.groupby("Family")["Rows"].sum().nlargest(top).index
+    families.loc[~families["Family"].isin(leaders), "Family"] = "Other"
+    return families.groupby(["Family", "Status"], as_index=False)["Rows"].sum()
+
+
+def open_rows_by_age(priority: pd.DataFrame, today: date = None) -> pd.DataFrame:
+    """Open rows per status and how far past their Priority week they are."""
+    today = today or date.today()
+    open_rows = priority[~priority["Status"].isin(CLOSED_STATUSES)].copy()
+    due = pd.to_datetime(open_rows["Week"], errors="coerce") + timedelta(days=6)
+    weeks_late = (pd.Timestamp(today) - due).dt.days / 7
+
+    def bucket(weeks):
+        if pd.isna(weeks):
+            return "no priority"
+        for limit, label in AGE_BUCKETS:
+            if limit is None or weeks < limit:
+                return label
+
+    open_rows["Age"] = weeks_late.map(bucket)
+    return open_rows.groupby(["Age", "Status"], as_index=False)["Rows"].sum()
+
+
+@timed("dashboard")
+def dashboard_frames() -> Dict[str, pd.DataFrame]:
+    rollups = read_rollups(table_revision())
+    daily = rollups["daily"].replace({"Status": {"": NO_STATUS}})
+    return {
+        "over_time": status_over_time(daily) if not daily.empty else pd.DataFrame(),
+        "throughput": weekly_throughput(daily),
+        "product": rows_per_product(rollups["product"].replace({"Status": {"": NO_STATUS}})),
+        "aging": open_rows_by_age(rollups["priority"].replace({"Status": {"": NO_STATUS}})),
+    }
+
+
+def display_dashboard():
+    import plotly.express as px
+
+    st.header("📊 Homologation dashboard")
+    frames = dashboard_frames()
+    if frames["over_time"].empty:
+        st.info("The tracker is empty: import rows to see the dashboard.")
+        return
+
+    over_time = frames["over_time"].rename_axis(index="Day", columns="Status").reset_index()
+    over_time = over_time.melt(id_vars="Day", var_name="Status", value_name="Rows")
+    st.plotly_chart(
+        px.area(over_time, x="Day", y="Rows", color="Status", line_shape="hv", title="Requests per status over time")
+    )
+
+    left, right = st.columns(2)
+    with left:
+        product = frames["product"]
+        order = product.groupby("Family")["Rows"].sum().sort_values(ascending=False).index.tolist()
+        st.plotly_chart(
+            px.bar(
+                product, x="Family", y="Rows", color="Status", title="Requests per product",
+                category_orders={"Family": order},
+            )
+        )
+    with right:
+        aging = frames["aging"]
+        st.plotly_chart(
+            px.bar(
+                aging, x="Age", y="Rows", color="Status", title="Open requests past their priority",
+                category_orders={"Age": [label for _, label in AGE_BUCKETS] + ["no priority"]},
+            )
+        )
+
+    throughput = frames["throughput"]
+    if not throughput.empty:
+        st.plotly_chart(
+            px.bar(throughput, x="Week", y="Closed", color="Status", title="Homologations closed per week")
+        )
@@ -1,62 +1,756 @@
-import sqlite3, os
+import sqlite3
 import pandas as pd
-from sqlalchemy import create_engine, text
-from datetime import datetime
 import streamlit as st
 from typing import Dict
-from pathlib import Path
 
+from profiling import count, timed
+from storage import SQLiteStorage, database_location
+from tracker_diff import to_db_value
 
-DB_NAME = 'project_tracker.db'
+
+# The SQLite file named by DB_PATH (see storage.py)
+DB_NAME = database_location()
+
+# --- Defined Homologation Options ---
+HOMOLOGATION_OPTIONS = [
+    "⏳AWAIT R&D", 
+    "🆘PRODUCT N/A", 
+    "🔍GOT PRODUCT", 
+    "🛠️FUNCTION", 
+    "📡 EMC RADIATED", 
+    "⚡ EMC CONDUCTED",
+    "⚙️ FACTORY",
+    "❌ FAILED", 
+    "✅ PASSED",
+    "📋.DOC"
+]
+
+TRACKER_TABLE = """
+    CREATE TABLE ValidationTracker (
+        ID INTEGER PRIMARY KEY,
+        Request TEXT NOT NULL CHECK (trim(Request) <> ''),
+        Priority TIMESTAMP CHECK (Priority IS NULL OR datetime(Priority) IS NOT NULL),
+        Homologated TEXT REFERENCES HomologationStatus (Status) ON UPDATE CASCADE,
+        Current TEXT,
+        New TEXT,
+        Product TEXT,
+        Position TEXT,
+        Note TEXT
+    )
+"""
+
+# Columns of the layouts written by older versions, renamed on migration
+LEGACY_COLUMNS = {"Product_ID": "Request", "Referencet": "Product"}
+
+
+def _migrate_v1(conn):
+    """Typed ValidationTracker with an ID primary key and a status lookup table.
+
+    Request is not unique (a request has one row per product and component),
+    so rows get a surrogate ID; existing rowids are kept as IDs. Nothing of
+    the old table is dropped: columns the new one does not know are kept as
+    TEXT columns (an old ID column as LegacyID), a Priority that is not a date
+    is appended to Note, and the old table stays as ValidationTracker_legacy
+    until it is dropped by hand.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS TableRevision (
+            name TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE HomologationStatus (
+            Status TEXT PRIMARY KEY,
+            Position INTEGER,
+            Active INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    sync_status_lookup(conn)
+
+    old_columns = table_columns(conn)
+    triggers = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'ValidationTracker'"
+    ).fetchall()
+    for (trigger,) in triggers:
+        conn.execute(f'DROP TRIGGER "{trigger}"')
+    conn.execute("DROP TABLE IF EXISTS TrackerSearch")
+    if not old_columns:
+        conn.execute(TRACKER_TABLE)
+        create_search_index(conn)
+        return
+
+    conn.execute("ALTER TABLE ValidationTracker RENAME TO ValidationTracker_legacy")
+    # Indexes keep their names on rename and would stop the new table's from being created
+    indexes = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'ValidationTracker_legacy' AND sql IS NOT NULL"
+    ).fetchall()
+    for (index,) in indexes:
+        conn.execute(f'DROP INDEX "{index}"')
+    conn.execute(TRACKER_TABLE)
+
+    source = {LEGACY_COLUMNS.get(col, col): col for col in old_columns}
+    if "Request" in old_columns:
+        source = {col: col for col in old_columns}
+    # Old IDs need not be unique integers, the rowids become the new IDs
+    if "ID" in source:
+        source["LegacyID"] = source.pop("ID")
+    extra = [col for col in source if col not in table_columns(conn)]
+    for col in extra:
+        conn.execute(f'ALTER TABLE ValidationTracker ADD COLUMN "{col}" TEXT')
+
+    def expr(col):
+        return f'"{source[col]}"' if col in source else "NULL"
+
+    priority = expr("Priority")
+    not_a_date = f"nullif(trim({priority}), '') IS NOT NULL AND datetime({priority}) IS NULL"
+
+    # Statuses no longer in HOMOLOGATION_OPTIONS stay valid but inactive
+    if "Homologated" in source:
+        conn.execute(f"""
+            INSERT OR IGNORE INTO HomologationStatus (Status, Active)
+            SELECT DISTINCT trim({expr("Homologated")}), 0 FROM ValidationTracker_legacy
+            WHERE trim({expr("Homologated")}) <> ''
+        """)
+
+    extra_columns = "".join(f', "{col}"' for col in extra)
+    extra_values = "".join(f", {expr(col)}" for col in extra)
+    conn.execute(f"""
+        INSERT INTO ValidationTracker (ID, Request, Priority, Homologated, Current, New, Product, Position, Note{extra_columns})
+        SELECT
+            rowid,
+            coalesce(nullif(trim({expr("Request")}), ''), 'UNKNOWN-' || rowid),
+            CASE WHEN datetime({priority}) IS NULL THEN NULL ELSE {priority} END,
+            nullif(trim({expr("Homologated")}), ''),
+            {expr("Current")}, {expr("New")}, {expr("Product")}, {expr("Position")},
+            CASE WHEN {not_a_date}
+                THEN coalesce(nullif({expr("Note")}, '') || char(10), '') || 'Priority: ' || {priority}
+                ELSE {expr("Note")} END{extra_values}
+        FROM ValidationTracker_legacy
+        ORDER BY rowid
+    """)
+    create_search_index(conn)
+
+
+# Tracker columns whose changes are written to ChangeLog
+LOGGED_COLUMNS = ("Request", "Priority", "Homologated", "Current", "New", "Product", "Position", "Note")
+
+
+def _log_trigger(operation: str, row: str, condition) -> str:
+    fields = "\n            UNION ALL ".join(
+        f"SELECT '{col}' AS Field, {'old.' + col if operation != 'insert' else 'NULL'} AS OldValue, "
+        f"{'new.' + col if operation != 'delete' else 'NULL'} AS NewValue WHERE {condition(col)}"
+        for col in LOGGED_COLUMNS
+    )
+    return f"""
+        CREATE TRIGGER trg_tracker_log_{operation} AFTER {operation.upper()} ON ValidationTracker BEGIN
+            INSERT INTO ChangeLog (TrackerID, Request, Operation, Field, OldValue, NewValue, Source)
+            SELECT {row}.ID, {row}.Request, '{operation}', Field, OldValue, NewValue,
+                   (SELECT Source FROM ChangeContext WHERE ID = 1)
+            FROM (
+            {fields}
+            );
+        END
+    """
+
+
+def _migrate_v2(conn):
+    """Append-only field-level change log, filled by triggers on every write path."""
+    conn.execute("""
+        CREATE TABLE ChangeLog (
+            Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ChangedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            TrackerID INTEGER NOT NULL,
+            Request TEXT,
+            Operation TEXT NOT NULL CHECK (Operation IN ('insert', 'update', 'delete')),
+            Field TEXT NOT NULL,
+            OldValue TEXT,
+            NewValue TEXT,
+            Source TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX idx_changelog_request ON ChangeLog (Request, Field, Seq)")
+    conn.execute("CREATE INDEX idx_changelog_tracker ON ChangeLog (TrackerID, Seq)")
+    conn.execute("""
+        CREATE TRIGGER trg_changelog_no_update BEFORE UPDATE ON ChangeLog BEGIN
+            SELECT RAISE(ABORT, 'ChangeLog is append-only');
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER trg_changelog_no_delete BEFORE DELETE ON ChangeLog BEGIN
+            SELECT RAISE(ABORT, 'ChangeLog is append-only');
+        END
+    """)
+
+    # Who is writing: set by the storage's transaction(source=...)
+    conn.execute("""
+        CREATE TABLE ChangeContext (
+            ID INTEGER PRIMARY KEY CHECK (ID = 1),
+            Source TEXT NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO ChangeContext (ID, Source) VALUES (1, 'unknown')")
+
+    conn.execute(_log_trigger("insert", "new", lambda col: f"new.{col} IS NOT NULL"))
+    conn.execute(_log_trigger("update", "new", lambda col: f"old.{col} IS NOT new.{col}"))
+    conn.execute(_log_trigger("delete", "old", lambda col: f"old.{col} IS NOT NULL"))
+
+
+def _migrate_v3(conn):
+    """Validation plans ingested from .docx files, linked to tracker rows by Request."""
+    conn.execute("""
+        CREATE TABLE ValidationPlan (
+            ID INTEGER PRIMARY KEY,
+            ContentHash TEXT NOT NULL UNIQUE,
+            FileName TEXT NOT NULL,
+            Request TEXT,
+            Metadata TEXT NOT NULL,
+            ImportedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX idx_validationplan_request ON ValidationPlan (Request)")
+    conn.execute("""
+        CREATE TABLE ValidationTestCase (
+            PlanID INTEGER NOT NULL REFERENCES ValidationPlan(ID) ON DELETE CASCADE,
+            Position INTEGER NOT NULL,
+            TestID TEXT,
+            Objective TEXT,
+            Result TEXT,
+            PRIMARY KEY (PlanID, Position)
+        )
+    """)
+
+
+def _migrate_v4(conn):
+    """Report and validation plan drafts, stored per section so autosave writes only what changed."""
+    conn.execute("""
+        CREATE TABLE Draft (
+            ID INTEGER PRIMARY KEY,
+            Kind TEXT NOT NULL,
+            DocID TEXT COLLATE NOCASE,
+            Codigos TEXT COLLATE NOCASE,
+            CreatedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UpdatedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX idx_draft_docid ON Draft (Kind, DocID)")
+    conn.execute("CREATE INDEX idx_draft_codigos ON Draft (Kind, Codigos)")
+    conn.execute("CREATE INDEX idx_draft_updated ON Draft (Kind, UpdatedAt)")
+    conn.execute("""
+        CREATE TABLE DraftSection (
+            DraftID INTEGER NOT NULL REFERENCES Draft(ID) ON DELETE CASCADE,
+            Section TEXT NOT NULL,
+            Digest TEXT NOT NULL,
+            Body BLOB NOT NULL,
+            PRIMARY KEY (DraftID, Section)
+        ) WITHOUT ROWID
+    """)
+
+
+# Rollup keys of a tracker row: untriaged rows count under the '' status,
+# and Priority is bucketed by the Monday of its week
+ROLLUP_STATUS = "coalesce({row}.Homologated, '')"
+ROLLUP_PRODUCT = "coalesce(trim({row}.Product), '')"
+ROLLUP_WEEK = "coalesce(date({row}.Priority, '-6 days', 'weekday 1'), '')"
+
+
+def _rollup_steps(row: str, sign: int) -> str:
+    """Statements adding (sign=1) or removing (sign=-1) one row from the rollups."""
+    status, product, week = (key.format(row=row) for key in (ROLLUP_STATUS, ROLLUP_PRODUCT, ROLLUP_WEEK))
+    return f"""
+        INSERT INTO ProductStatus (Product, Status, Rows) VALUES ({product}, {status}, {sign})
+        ON CONFLICT(Product, Status) DO UPDATE SET Rows = Rows + excluded.Rows;
+        INSERT INTO PriorityWeek (Week, Status, Rows) VALUES ({week}, {status}, {sign})
+        ON CONFLICT(Week, Status) DO UPDATE SET Rows = Rows + excluded.Rows;
+    """
+
+
+def _status_day_step(row: str, column: str) -> str:
+    """Counts the row's status as entered or exited today."""
+    entered, exited = (1, 0) if column == "Entered" else (0, 1)
+    return f"""
+        INSERT INTO StatusDaily (Day, Status, Entered, Exited)
+        VALUES (date('now'), {ROLLUP_STATUS.format(row=row)}, {entered}, {exited})
+        ON CONFLICT(Day, Status) DO UPDATE SET
+            Entered = Entered + excluded.Entered, Exited = Exited + excluded.Exited;
+    """
+
+
+def _migrate_v5(conn):
+    """Dashboard rollups (status per day, rows per product and per Priority week), kept by triggers.
+
+    Every write path goes through ValidationTracker, so the triggers keep the
+    rollups exact and the dashboard reads a few hundred rows at any tracker
+    size. Status history before the ChangeLog existed, and that of untriaged
+    rows, is folded into the first recorded day.
+    """
+    conn.execute("""
+        CREATE TABLE StatusDaily (
+            Day TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            Entered INTEGER NOT NULL DEFAULT 0,
+            Exited INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (Day, Status)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE ProductStatus (
+            Product TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            Rows INTEGER NOT NULL,
+            PRIMARY KEY (Product, Status)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE PriorityWeek (
+            Week TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            Rows INTEGER NOT NULL,
+            PRIMARY KEY (Week, Status)
+        ) WITHOUT ROWID
+    """)
+
+    status, product, week = (key.format(row="t") for key in (ROLLUP_STATUS, ROLLUP_PRODUCT, ROLLUP_WEEK))
+    conn.execute(f"""
+        INSERT INTO ProductStatus (Product, Status, Rows)
+        SELECT {product}, {status}, count(*) FROM ValidationTracker AS t GROUP BY 1, 2
+    """)
+    conn.execute(f"""
+        INSERT INTO PriorityWeek (Week, Status, Rows)
+        SELECT {week}, {status}, count(*) FROM ValidationTracker AS t GROUP BY 1, 2
+    """)
+    # Replay the logged status changes, then fold what the log does not explain
+    # into its first day so the running totals match the table
+    conn.execute("""
+        INSERT INTO StatusDaily (Day, Status, Entered, Exited)
+        SELECT Day, Status, sum(Entered), sum(Exited) FROM (
+            SELECT date(ChangedAt) AS Day, NewValue AS Status, 1 AS Entered, 0 AS Exited
+            FROM ChangeLog WHERE Field = 'Homologated' AND NewValue IS NOT NULL
+            UNION ALL
+            SELECT date(ChangedAt), OldValue, 0, 1
+            FROM ChangeLog WHERE Field = 'Homologated' AND OldValue IS NOT NULL
+        )
+        GROUP BY Day, Status
+    """)
+    conn.execute(f"""
+        INSERT INTO StatusDaily (Day, Status, Entered, Exited)
+        SELECT (SELECT coalesce(min(Day), date('now')) FROM StatusDaily), Status, max(n, 0), max(-n, 0)
+        FROM (
+            SELECT Status, sum(n) AS n FROM (
+                SELECT {status} AS Status, count(*) AS n FROM ValidationTracker AS t GROUP BY 1
+                UNION ALL
+                SELECT Status, Exited - Entered FROM StatusDaily
+            )
+            GROUP BY Status
+        )
+        WHERE n <> 0
+        ON CONFLICT(Day, Status) DO UPDATE SET
+            Entered = Entered + excluded.Entered, Exited = Exited + excluded.Exited
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER trg_tracker_rollup_insert AFTER INSERT ON ValidationTracker BEGIN
+            {_rollup_steps("new", 1)}
+            {_status_day_step("new", "Entered")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_tracker_rollup_delete AFTER DELETE ON ValidationTracker BEGIN
+            {_rollup_steps("old", -1)}
+            {_status_day_step("old", "Exited")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_tracker_rollup_update AFTER UPDATE OF Homologated, Product, Priority ON ValidationTracker
+        WHEN old.Homologated IS NOT new.Homologated OR old.Product IS NOT new.Product OR old.Priority IS NOT new.Priority
+        BEGIN
+            {_rollup_steps("old", -1)}
+            {_rollup_steps("new", 1)}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_tracker_rollup_status AFTER UPDATE OF Homologated ON ValidationTracker
+        WHEN old.Homologated IS NOT new.Homologated
+        BEGIN
+            {_status_day_step("old", "Exited")}
+            {_status_day_step("new", "Entered")}
+        END
+    """)
+
+
+def _migrate_v6(conn):
+    """Per-row Version for optimistic concurrency, see apply_changes()."""
+    conn.execute("ALTER TABLE ValidationTracker ADD COLUMN Version INTEGER NOT NULL DEFAULT 1")
+    # Writers that do not bump Version themselves (imports) still invalidate
+    # the rows editors are holding
+    conn.execute("""
+        CREATE TRIGGER trg_tracker_version AFTER UPDATE ON ValidationTracker
+        WHEN new.Version IS old.Version
+        BEGIN
+            UPDATE ValidationTracker SET Version = old.Version + 1 WHERE ID = new.ID;
+        END
+    """)
+    # Re-index only when a searched column changes, not on every version bump
+    conn.execute("DROP TRIGGER IF EXISTS trg_tracker_search_update")
+    create_search_index(conn)
+
+
+# Ordered schema migrations; each runs once, in its own transaction
+MIGRATIONS = [
+    (1, _migrate_v1),
+    (2, _migrate_v2),
+    (3, _migrate_v3),
+    (4, _migrate_v4),
+    (5, _migrate_v5),
+    (6, _migrate_v6),
+]
+
+
+def sync_status_lookup(conn):
+    """Adds new HOMOLOGATION_OPTIONS to the lookup table and keeps their order."""
+    conn.executemany(
+        """
+        INSERT INTO HomologationStatus (Status, Position, Active) VALUES (?, ?, 1)
+        ON CONFLICT(Status) DO UPDATE SET Position = excluded.Position, Active = 1
+        """,
+        [(status, position) for position, status in enumerate(HOMOLOGATION_OPTIONS)],
+    )
+
+
+def schema_version(conn) -> int:
+    return conn.execute("SELECT coalesce(max(version), 0) FROM schema_version").fetchone()[0]
+
+
+def create_schema(conn):
+    """Brings the SQLite DB to the latest schema version (runs once per process)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for version, migrate in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if schema_version(conn) < version:
+                migrate(conn)
+                conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    if conn.execute("SELECT count(*) FROM HomologationStatus WHERE Active = 1").fetchone()[0] != len(HOMOLOGATION_OPTIONS):
+        with conn:
+            sync_status_lookup(conn)
+
+
+TRACKER_INDEXES = {
+    "idx_tracker_request": "Request",
+    "idx_tracker_homologated": "Homologated",
+    "idx_tracker_product": "Product",
+    "idx_tracker_priority": "Priority",
+}
+
+# Columns the paged editor can be sorted by, and the SQL they sort on; ID
+# keeps the order stable. Statuses follow HOMOLOGATION_OPTIONS, not the
+# alphabetical order of their emoji labels.
+SORT_COLUMNS = {
+    "Priority": "Priority",
+    "Homologated": (
+        "(SELECT Position FROM HomologationStatus"
+        " WHERE HomologationStatus.Status = ValidationTracker.Homologated)"
+    ),
+}
+
+# Columns covered by the full-text index. The trigram tokenizer makes MATCH
+# behave like a case-insensitive substring search for terms of 3+ characters.
+SEARCH_COLUMNS = ("Request", "Product", "New", "Note")
+
+
+def table_columns(conn, table_name: str = "ValidationTracker"):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+
+def create_search_index(conn):
+    """Creates the B-tree indexes, the FTS5 table and the triggers keeping it in sync."""
+    columns = table_columns(conn)
+    for index_name, column in TRACKER_INDEXES.items():
+        if column in columns:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON ValidationTracker ("{column}")')
+
+    if not all(column in columns for column in SEARCH_COLUMNS):
+        return
+
+    fts_columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS TrackerSearch USING fts5(
+                {fts_columns}, content='ValidationTracker', content_rowid='ID', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5/trigram: searches fall back to LIKE
+        return
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tracker_search_insert AFTER INSERT ON ValidationTracker BEGIN
+            INSERT INTO TrackerSearch (rowid, {fts_columns}) VALUES (new.ID, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tracker_search_delete AFTER DELETE ON ValidationTracker BEGIN
+            INSERT INTO TrackerSearch (TrackerSearch, rowid, {fts_columns}) VALUES ('delete', old.ID, {old_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tracker_search_update AFTER UPDATE OF {fts_columns} ON ValidationTracker BEGIN
+            INSERT INTO TrackerSearch (TrackerSearch, rowid, {fts_columns}) VALUES ('delete', old.ID, {old_values});
+            INSERT INTO TrackerSearch (rowid, {fts_columns}) VALUES (new.ID, {new_values});
+        END
+    """)
+
+    indexed = conn.execute("SELECT count(*) FROM TrackerSearch_docsize").fetchone()[0]
+    if indexed == 0:
+        conn.execute("INSERT INTO TrackerSearch (TrackerSearch) VALUES ('rebuild')")
+
+
+def has_search_index(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'TrackerSearch'"
+    ).fetchone() is not None
+
+
+def like_escape(term: str) -> str:
+    """term with LIKE wildcards escaped, for LIKE ... ESCAPE '\\'."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_pattern(term: str) -> str:
+    return f"%{like_escape(term)}%"
+
+
+@timed("filter.build")
+def build_tracker_filter(filters: Dict, use_fts: bool = True):
+    """Turns the tracker search widgets into a WHERE clause and its parameters.
+
+    filters maps a column in SEARCH_COLUMNS to a substring and "Homologated"
+    to a list of statuses. Terms of 3+ characters go through the FTS5 index;
+    shorter ones fall back to LIKE.
+    """
+    clauses, params, match_terms = [], [], []
+
+    for column in SEARCH_COLUMNS:
+        term = (filters.get(column) or "").strip()
+        if not term:
+            continue
+        if use_fts and len(term) >= 3:
+            quoted = term.replace('"', '""')
+            match_terms.append(f'{column} : "{quoted}"')
+        else:
+            clauses.append(f"\"{column}\" LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(term))
+
+    if match_terms:
+        clauses.insert(0, "ID IN (SELECT rowid FROM TrackerSearch WHERE TrackerSearch MATCH ?)")
+        params.insert(0, " AND ".join(match_terms))
+
+    statuses = list(filters.get("Homologated") or [])
+    if statuses:
+        clauses.append(f"Homologated IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+
+    where = " AND ".join(clauses)
+    return (f"WHERE {where}" if where else ""), params
+
+
+@st.cache_resource(show_spinner=False)
+def open_database(location: str) -> SQLiteStorage:
+    """One storage per process and database, shared by all sessions.
+
+    The schema is brought up to date when the storage is opened.
+    """
+    storage = SQLiteStorage(location)
+    with storage.write_lock() as conn:
+        create_schema(conn)
+        storage.use_fts = has_search_index(conn)
+    return storage
+
+def get_connection_manager(db_name: str = None) -> SQLiteStorage:
+    """The storage of db_name, DB_NAME by default; both spellings share one storage."""
+    return open_database(db_name or DB_NAME)
 
 def database():
-    """Ensures the SQLite DB and table exist."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ValidationTracker (
-            Product_ID TEXT PRIMARY KEY,
-            Referencet TEXT,
-            Priority DATE,
-            Homologated TEXT,
-            Note TEXT,
-            Current TEXT,
-            Position TEXT,
-            New TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def get_data_from_db(query):
+    """Ensures the DB and its tables exist (schema setup runs once per process)."""
+    return get_connection_manager()
+
+def bump_revision(conn, table_name: str = "ValidationTracker"):
+    """Marks the table as changed; must run inside the write transaction."""
+    conn.execute(
+        """
+        INSERT INTO TableRevision (name, revision) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET revision = revision + 1
+        """,
+        (table_name,),
+    )
+
+class StaleRevisionError(Exception):
+    """The table changed since the revision a writer based its changes on."""
+
+
+def check_revision(conn, expected: int, table_name: str = "ValidationTracker"):
+    """Raises StaleRevisionError unless the table is still at expected; run it inside the write transaction."""
+    row = conn.execute("SELECT revision FROM TableRevision WHERE name = ?", (table_name,)).fetchone()
+    current = row[0] if row else 0
+    if current != expected:
+        raise StaleRevisionError(f"{table_name} is at revision {current}, not {expected}")
+
+def table_revision(table_name: str = "ValidationTracker") -> int:
+    """Current revision of a table, used as the key of every cached read."""
+    return get_connection_manager().revision(table_name)
+
+def search_tracker_query(
+    filters: Dict,
+    select: str = "*",
+    sort_by: str = None,
+    descending: bool = False,
+    limit: int = None,
+    offset: int = 0,
+):
+    """SQL and parameters selecting the tracker rows that match the filters.
+
+    With limit set, only one page is returned (LIMIT/OFFSET), sorted in SQL by
+    one of SORT_COLUMNS.
+    """
+    where, params = build_tracker_filter(filters, get_connection_manager().use_fts)
+    direction = "DESC" if descending else "ASC"
+    order = f"ID {direction}"
+    if sort_by in SORT_COLUMNS:
+        order = f"{SORT_COLUMNS[sort_by]} {direction}, {order}"
+
+    query = f"SELECT {select} FROM ValidationTracker {where} ORDER BY {order}"
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"
+        params = params + [int(limit), int(offset)]
+    return query, params
+
+def count_tracker_query(filters: Dict):
+    """SQL and parameters counting the tracker rows that match the filters."""
+    where, params = build_tracker_filter(filters, get_connection_manager().use_fts)
+    return f"SELECT count(*) AS n FROM ValidationTracker {where}", params
+
+@timed("db.read")
+def get_data_from_db(query, params=None):
     """Fetches data from DB."""
-    conn = sqlite3.connect(DB_NAME)
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    with get_connection_manager().reader() as conn:
+        data = pd.read_sql_query(query, conn, params=params)
+    count(rows_read=len(data))
+    return data
 
+@timed("db.update_data")
 def update_data(df: pd.DataFrame):
-    import sqlite3
-
+    """Replaces every tracker row with the DataFrame, keeping the table schema."""
     table_name = "ValidationTracker" 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
 
-    # Replace existing table with new data
-    df.to_sql(table_name, conn, if_exists="replace", index=False)
+    with get_connection_manager().transaction(source="replace") as conn:
+        known = table_columns(conn, table_name)
+        columns = [col for col in df.columns if col in known]
+        quoted = ", ".join(f'"{col}"' for col in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        conn.execute(f'DELETE FROM "{table_name}"')
+        count(rows_written=len(df))
+        conn.executemany(
+            f'INSERT INTO "{table_name}" ({quoted}) VALUES ({placeholders})',
+            ([to_db_value(value) for value in row] for row in df[columns].itertuples(index=False, name=None)),
+        )
+        bump_revision(conn, table_name)
+
+@timed("db.apply_changes")
+def apply_changes(changes, table_name: str = "ValidationTracker", source: str = "editor"):
+    """Writes a ChangeSet as INSERT/UPDATE/DELETE statements in one transaction.
+
+    Rows are addressed by ID, so the cost follows the number of changed
+    rows instead of the size of the table. Updates and deletes are
+    compare-and-swap on the row's Version: a row changed by someone else
+    since it was loaded is left alone. Returns the IDs of those rows.
+    """
+    if changes.is_empty():
+        return []
+    count(rows_written=len(changes))
+
+    conflicts = []
+    with get_connection_manager().transaction(source=source) as conn:
+        for row_id in changes.deletes:
+            deleted = conn.execute(
+                f'DELETE FROM "{table_name}" WHERE ID = ? AND Version = coalesce(?, Version)',
+                (row_id, changes.versions.get(row_id)),
+            ).rowcount
+            if not deleted:
+                conflicts.append(row_id)
+
+        for row_id, changed in changes.updates.items():
+            assignments = ", ".join(f'"{col}" = ?' for col in changed)
+            updated = conn.execute(
+                f'UPDATE "{table_name}" SET {assignments}, Version = Version + 1 '
+                f'WHERE ID = ? AND Version = coalesce(?, Version)',
+                [new for _, new in changed.values()] + [row_id, changes.versions.get(row_id)],
+            ).rowcount
+            if not updated:
+                conflicts.append(row_id)
+
+        for row in changes.inserts:
+            columns = ", ".join(f'"{col}"' for col in row)
+            placeholders = ", ".join("?" for _ in row)
+            conn.execute(
+                f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})',
+                list(row.values()),
+            )
 
-    conn.commit()
-    conn.close()
+        count(conflicts=len(conflicts))
+        bump_revision(conn, table_name)
+    return conflicts
 
 def fill_database_from_file(uploaded_file):
-    """Fills DB from an uploaded Excel file, overwriting existing data."""
+    """Upserts the rows of an uploaded Excel file into the DB (see excel_import)."""
+    from excel_import import ImportValidationError, import_workbook
+
     try:
-        df = pd.read_excel(uploaded_file)
-        if 'ID' not in df.columns or df['ID'].isnull().any():
-            st.warning("Generating new IDs for the uploaded data.")
-            df['ID'] = [str(int(datetime.now().timestamp() * 1000000) + i) for i in range(len(df))]
-        
-        update_data(df)
-        st.success("Database has been populated successfully.")
+        result = import_workbook(uploaded_file)
+        st.success(f"Database has been populated successfully: {result['inserted']} added, {result['updated']} updated.")
+    except ImportValidationError as e:
+        st.error("Import rolled back, nothing was changed:\n\n" + "\n".join(f"- {err}" for err in e.errors))
     except Exception as e:
-        st.error(f"Error filling database: {e}")
\ No newline at end of file
+        st.error(f"Error filling database: {e}")
+
+
+def latest_change_seq() -> int:
+    """Sequence number of the newest ChangeLog row (0 when empty)."""
+    with get_connection_manager().reader() as conn:
+        return conn.execute("SELECT coalesce(max(Seq), 0) FROM ChangeLog").fetchone()[0]
+
+
+def changes_since(seq: int = 0, limit: int = 10000) -> pd.DataFrame:
+    """ChangeLog rows with Seq > seq, oldest first.
+
+    Clients remember the last Seq they saw and only fetch what changed since.
+    """
+    return get_data_from_db(
+        "SELECT * FROM ChangeLog WHERE Seq > ? ORDER BY Seq LIMIT ?",
+        [int(seq), int(limit)],
+    )
+
+
+def request_history(request: str, field: str = "Homologated") -> pd.DataFrame:
+    """Every recorded change of one field for a request, oldest first."""
+    return get_data_from_db(
+        """
+        SELECT Seq, ChangedAt, TrackerID, Operation, OldValue, NewValue, Source
+        FROM ChangeLog WHERE Request = ? AND Field = ? ORDER BY Seq
+        """,
+        [request, field],
+    )
\ No newline at end of file
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from database import get_connection_manager, like_escape
+
+# Seconds without edits before a changed draft is written
+AUTOSAVE_DELAY = 3.0
+DRAFT_LIST_LIMIT = 50
+# Top-level keys of a draft that name it in the drafts list
+DRAFT_LABELS = {"report": ("doc_id", "codigos"), "validation": ("project_part", "component_change")}
+
+
+def encode_sections(data: Dict) -> Dict[str, Tuple[str, bytes]]:
+    """Splits a draft into sections, each as (digest, compressed compact JSON).
+
+    Every list value (comparison tables, links, test cases) is its own
+    section; the scalar fields share the "fields" section. Only the fields are
+    sorted (for a stable digest): table rows keep their column order.
+    """
+    sections = {"fields": {key: value for key, value in sorted(data.items()) if not isinstance(value, list)}}
+    sections.update({key: value for key, value in data.items() if isinstance(value, list)})
+    encoded = {}
+    for name, value in sections.items():
+        raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+        encoded[name] = (hashlib.sha1(raw).hexdigest(), zlib.compress(raw))
+    return encoded
+
+
+def save_draft(kind: str, data: Dict, draft_id: Optional[int] = None, saved: Optional[Dict[str, str]] = None):
+    """Writes the sections whose digest differs from saved ({section: digest}).
+
+    Returns (draft_id, digests of every section, number of sections written).
+    """
+    sections = encode_sections(data)
+    saved = saved or {}
+    changed = [(name, digest, body) for name, (digest, body) in sections.items() if saved.get(name) != digest]
+    doc_key, code_key = DRAFT_LABELS[kind]
+    labels = (str(data.get(doc_key) or "").strip() or None, str(data.get(code_key) or "").strip() or None)
+
+    with get_connection_manager().transaction(source="draft") as conn:
+        if draft_id is None:
+            draft_id = conn.execute(
+                "INSERT INTO Draft (Kind, DocID, Codigos) VALUES (?, ?, ?)", (kind, *labels)
+            ).lastrowid
+        else:
+            conn.execute(
+                "UPDATE Draft SET DocID = ?, Codigos = ?, UpdatedAt = CURRENT_TIMESTAMP WHERE ID = ?",
+                (*labels, draft_id),
+            )
+        conn.executemany(
+            """
+            INSERT INTO DraftSection (DraftID, Section, Digest, Body) VALUES (?, ?, ?, ?)
+            ON CONFLICT(DraftID, Section) DO UPDATE SET Digest = excluded.Digest, Body = excluded.Body
+            """,
+            [(draft_id, name, digest, body) for name, digest, body in changed],
+        )
+        removed = [name for name in saved if name not in sections]
+        conn.executemany(
+            "DELETE FROM DraftSection WHERE DraftID = ? AND Section = ?",
+            [(draft_id, name) for name in removed],
+        )
+    return draft_id, {name: digest for name, (digest, _) in sections.items()}, len(changed)
+
+
+def load_draft(draft_id: int) -> Tuple[Dict, Dict[str, str]]:
+    """Returns the draft's data and the digests of its stored sections."""
+    with get_connection_manager().reader() as conn:
+        rows = conn.execute(
+            "SELECT Section, Digest, Body FROM DraftSection WHERE DraftID = ?", (draft_id,)
+        ).fetchall()
+    data, digests = {}, {}
+    for name, digest, body in rows:
+        value = json.loads(zlib.decompress(body))
+        if name == "fields":
+            data.update(value)
+        else:
+            data[name] = value
+        digests[name] = digest
+    return data, digests
+
+
+def list_drafts(kind: str, search: str = "", limit: int = DRAFT_LIST_LIMIT) -> List[Tuple]:
+    """(ID, DocID, Codigos, UpdatedAt) of the newest drafts, optionally by doc id/códigos prefix."""
+    search = search.strip()
+    with get_connection_manager().reader() as conn:
+        if not search:
+            return conn.execute(
+                "SELECT ID, DocID, Codigos, UpdatedAt FROM Draft WHERE Kind = ? ORDER BY UpdatedAt DESC LIMIT ?",
+                (kind, limit),
+            ).fetchall()
+        # Prefix LIKE on the NOCASE columns is answered from idx_draft_docid / idx_draft_codigos
+        return conn.execute(
+            """
+            SELECT ID, DocID, Codigos, UpdatedAt FROM Draft WHERE Kind = ? AND DocID LIKE ? ESCAPE '\\'
+            UNION
+            SELECT ID, DocID, Codigos, UpdatedAt FROM Draft WHERE Kind = ? AND Codigos LIKE ? ESCAPE '\\'
+            ORDER BY UpdatedAt DESC LIMIT ?
+            """,
+            (kind, like_escape(search) + "%", kind, like_escape(search) + "%", limit),
+        ).fetchall()
+
+
+def delete_draft(draft_id: int):
+    with get_connection_manager().transaction(source="draft") as conn:
+        conn.execute("DELETE FROM Draft WHERE ID = ?", (draft_id,))
+
+
+def autosave(kind: str, data: Dict, delay: float = AUTOSAVE_DELAY):
+    """Debounced, dirty-checked save of the session's current draft.
+
+    Nothing is written while the digests match the last save. A change is
+    written once it has been left alone for delay seconds, so call this on
+    every run and from autosave_ticker().
+    """
+    state = st.session_state.get(f"{kind}_draft")
+    digests = {name: digest for name, (digest, _) in encode_sections(data).items()}
+    if state is None:
+        # A fresh form is not a draft yet: only create one once it is edited
+        st.session_state[f"{kind}_draft"] = {"id": None, "saved": digests, "seen": digests, "changed_at": 0.0}
+        return
+    if digests == state["saved"]:
+        return
+    now = time.monotonic()
+    if digests != state["seen"]:
+        state["seen"], state["changed_at"] = digests, now
+    if now - state["changed_at"] < delay:
+        return
+    state["id"], state["saved"], _ = save_draft(kind, data, state["id"], state["saved"])
+    state["saved_at"] = time.strftime("%H:%M:%S")
+
+
+def drafts_panel(kind: str, on_open: Callable[[Dict], None]):
+    """Autosave status plus the list of drafts to reopen or start over from.
+
+    on_open(data) replaces the form's content with a stored draft's data, or
+    with {} for a new draft; the page is rerun right after.
+    """
+    state = st.session_state.get(f"{kind}_draft") or {}
+    if state.get("saved_at"):
+        st.caption(f"Draft #{state['id']} saved at {state['saved_at']}")
+
+    search = st.text_input("Search doc ID / códigos", key=f"{kind}_draft_search")
+    drafts = list_drafts(kind, search)
+    labels = {draft_id: f"#{draft_id} · {doc or '—'} · {codes or '—'} · {updated}" for draft_id, doc, codes, updated in drafts}
+    selected = st.selectbox("Draft", list(labels), format_func=labels.get, key=f"{kind}_draft_pick")
+
+    open_col, new_col, delete_col = st.columns(3)
+    if open_col.button("Open draft", key=f"{kind}_draft_open", disabled=selected is None):
+        loaded, digests = load_draft(selected)
+        st.session_state[f"{kind}_draft"] = {"id": selected, "saved": digests, "seen": digests, "changed_at": 0.0}
+        on_open(loaded)
+        st.rerun()
+    if new_col.button("New draft", key=f"{kind}_draft_new"):
+        st.session_state.pop(f"{kind}_draft", None)
+        on_open({})
+        st.rerun()
+    if delete_col.button("Delete draft", key=f"{kind}_draft_delete", disabled=selected is None):
+        delete_draft(selected)
+        if state.get("id") == selected:
+            st.session_state.pop(f"{kind}_draft", None)
+        st.rerun()
+
+
+@st.fragment(run_every=AUTOSAVE_DELAY)
+def autosave_ticker(kind: str, get_data: Callable[[], Dict]):
+    """Flushes a pending autosave even when the user stops interacting."""
+    autosave(kind, get_data())
+
+
+def autosave_form(kind: str, get_data: Callable[[], Dict]):
+    """Autosaves the form's draft, see autosave(); call it at the end of the form.
+
+    The draft is written only once it changed and was left alone for
+    AUTOSAVE_DELAY seconds, on this run or from the ticker.
+    """
+    autosave(kind, get_data())
+    autosave_ticker(kind, get_data)
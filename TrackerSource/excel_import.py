@@ -0,0 +1,235 @@
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from database import HOMOLOGATION_OPTIONS, bump_revision, check_revision, get_connection_manager, table_columns
+from tracker_diff import ROW_ID, ROW_VERSION, to_db_value
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+# SQLite INTEGER range, for IDs
+MIN_ID, MAX_ID = -2**63, 2**63 - 1
+
+
+class ImportValidationError(Exception):
+    """Raised when workbook rows fail validation; the import is rolled back."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid row(s): " + "; ".join(errors[:5]))
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value)
+    return text if text.strip() else None
+
+
+def _date(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, (datetime, date)):
+        return to_db_value(value)
+    return to_db_value(datetime.fromisoformat(str(value).strip()))
+
+
+def validate_row(row: Dict) -> Dict:
+    """Normalizes one workbook row to DB values, raising ValueError if invalid."""
+    for col, value in row.items():
+        if isinstance(value, (list, dict, tuple, set)):
+            raise ValueError(f"{col} must be a single value")
+    clean = {col: _text(value) for col, value in row.items() if col != ROW_ID}
+    if row.get(ROW_ID) not in (None, ""):
+        try:
+            if isinstance(row[ROW_ID], bool):
+                raise TypeError()
+            clean[ROW_ID] = int(row[ROW_ID])
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"invalid ID {row[ROW_ID]!r}")
+        if not MIN_ID <= clean[ROW_ID] <= MAX_ID:
+            raise ValueError(f"ID {row[ROW_ID]!r} is out of range")
+    if not clean.get("Request"):
+        raise ValueError("missing Request")
+    if clean.get("Homologated"):
+        clean["Homologated"] = clean["Homologated"].strip()
+    if clean.get("Homologated") and clean["Homologated"] not in HOMOLOGATION_OPTIONS:
+        raise ValueError(f"unknown Homologated value {clean['Homologated']!r}")
+    if "Priority" in row:
+        try:
+            clean["Priority"] = _date(row["Priority"])
+        except ValueError:
+            raise ValueError(f"invalid Priority date {row['Priority']!r}")
+    return clean
+
+
+def _key(request, product, new):
+    return tuple((value or "").strip() for value in (request, product, new))
+
+
+def _by_columns(rows: Dict) -> Dict:
+    """Groups {target: {column: value}} by the columns each row writes."""
+    groups = {}
+    for target, values in rows.items():
+        columns = tuple(sorted(values))
+        groups.setdefault(columns, []).append([values[col] for col in columns] + [target])
+    return groups
+
+
+def _upsert_chunk(conn, rows: List[Dict]):
+    """Updates the rows that already exist and inserts the rest.
+
+    A row matches on its ID when the workbook carries one (tracker backups
+    do), otherwise on (Request, Product, New): a request has one row per
+    product and new component. A row writes only the columns it has, so a
+    record leaving a column out keeps the stored value. Returns (inserted,
+    updated), where rows whose values are already stored do not count as
+    updated and keep their Version.
+    """
+    ids = [row[ROW_ID] for row in rows if row.get(ROW_ID)]
+    existing_ids = set()
+    if ids:
+        placeholders = ", ".join("?" for _ in ids)
+        existing_ids = {row_id for (row_id,) in conn.execute(
+            f"SELECT ID FROM ValidationTracker WHERE ID IN ({placeholders})", ids
+        )}
+
+    requests = sorted({row["Request"] for row in rows} | {row["Request"].strip() for row in rows})
+    placeholders = ", ".join("?" for _ in requests)
+    existing = {}
+    for row_id, request, product, new in conn.execute(
+        f"SELECT ID, Request, Product, New FROM ValidationTracker WHERE Request IN ({placeholders})",
+        requests,
+    ):
+        existing.setdefault(_key(request, product, new), row_id)
+
+    targets, inserts = {}, {}
+    for row in rows:
+        values = {col: value for col, value in row.items() if col != ROW_ID}
+        row_id = row.get(ROW_ID) if row.get(ROW_ID) in existing_ids else None
+        key = _key(row["Request"], row.get("Product"), row.get("New"))
+        row_id = row_id or existing.get(key)
+        # Later rows win when the workbook repeats a row
+        if row_id is None:
+            inserts.setdefault(key, {}).update(values)
+        else:
+            targets.setdefault(row_id, {}).update(values)
+
+    updated = 0
+    for columns, params in _by_columns(targets).items():
+        assignments = ", ".join(f'"{col}" = ?' for col in columns)
+        # Skipping unchanged rows keeps the Version editors hold (see database.apply_changes())
+        changed = " OR ".join(f'"{col}" IS NOT ?' for col in columns)
+        updated += conn.executemany(
+            f"UPDATE ValidationTracker SET {assignments} WHERE ID = ? AND ({changed})",
+            [values + values[:-1] for values in params],
+        ).rowcount
+    for columns, params in _by_columns(inserts).items():
+        quoted = ", ".join(f'"{col}"' for col in columns)
+        conn.executemany(
+            f"INSERT INTO ValidationTracker ({quoted}) VALUES ({', '.join('?' for _ in columns)})",
+            [values[:-1] for values in params],
+        )
+    return len(inserts), updated
+
+
+def import_records(
+    records: Iterable[Dict],
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    total: Optional[int] = None,
+    source: str = "import",
+    first_line: int = 1,
+    expected_revision: Optional[int] = None,
+) -> Dict:
+    """Upserts rows ({column: value}) into ValidationTracker in one transaction.
+
+    Rows are written in chunks of CHUNK_SIZE, so memory stays bounded by the
+    chunk. Every row is validated: any invalid row rolls the import back and
+    raises ImportValidationError, whose messages count rows from first_line.
+    Existing rows are updated, see _upsert_chunk() for how they are matched.
+    With expected_revision, the import only runs if the table is still at
+    that revision (see database.check_revision()).
+    """
+    manager = get_connection_manager()
+    result = {"rows": 0, "inserted": 0, "updated": 0}
+    ignored = {}
+    errors = []
+    with manager.transaction(source=source) as conn:
+        if expected_revision is not None:
+            check_revision(conn, expected_revision)
+        # Version is the database's to bump, a backup's copy of it is stale
+        known = set(table_columns(conn)) - {ROW_VERSION}
+
+        chunk = []
+        for line, record in enumerate(records, start=first_line):
+            if all(value is None or value == "" for value in record.values()):
+                continue
+            ignored.update(dict.fromkeys(col for col in record if col and col not in known | {ROW_VERSION}))
+            try:
+                row = validate_row({col: value for col, value in record.items() if col in known})
+            except ValueError as e:
+                errors.append(f"row {line}: {e}")
+                if len(errors) >= MAX_REPORTED_ERRORS:
+                    break
+                continue
+            if errors:
+                continue  # the import is rolled back anyway, only keep validating
+
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                inserted, updated = _upsert_chunk(conn, chunk)
+                result["inserted"] += inserted
+                result["updated"] += updated
+                result["rows"] += len(chunk)
+                chunk = []
+                if progress:
+                    progress(line - first_line + 1, total)
+
+        if errors:
+            raise ImportValidationError(errors)
+        if chunk:
+            inserted, updated = _upsert_chunk(conn, chunk)
+            result["inserted"] += inserted
+            result["updated"] += updated
+            result["rows"] += len(chunk)
+        if result["inserted"] or result["updated"]:
+            bump_revision(conn)
+
+    result["ignored_columns"] = list(ignored)
+    if progress:
+        progress(total or result["rows"], total)
+    return result
+
+
+def import_rows(
+    header: List[str],
+    rows: Iterable[Sequence],
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    total: Optional[int] = None,
+    source: str = "import",
+    first_line: int = 2,
+) -> Dict:
+    """Upserts rows given as values in header order, see import_records()."""
+    if "Request" not in header:
+        raise ImportValidationError(["header row has no 'Request' column"])
+    return import_records((dict(zip(header, values)) for values in rows), progress, total, source, first_line)
+
+
+def import_workbook(file, progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict:
+    """Streams an .xlsx into ValidationTracker with upsert semantics, see import_rows().
+
+    Rows are read with openpyxl in read-only mode, so only the chunk being
+    written is held in memory.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = max((sheet.max_row or 1) - 1, 0) or None
+        rows = sheet.iter_rows(values_only=True)
+        header = [_text(cell) for cell in next(rows, ())]
+        return import_rows(header, rows, progress, total)
+    finally:
+        workbook.close()
@@ -0,0 +1,159 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import streamlit as st
+
+from profiling import span
+
+# Imports, exports and report builds running at once; each may use a process pool of its own
+JOB_WORKERS = 4
+# Finished jobs kept for their results (and to answer a repeated submit)
+MAX_FINISHED_JOBS = 32
+POLL_SECONDS = 1.0
+
+
+class JobCancelled(Exception):
+    """Raised by Job.progress() in the job's thread once the job was cancelled."""
+
+
+class Job:
+    """One piece of background work: its status, progress and, once done, its result."""
+
+    def __init__(self, kind: str, key=None, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.label = label or kind
+        self.status = "queued"
+        self.done, self.total = 0, None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancelling(self) -> bool:
+        return self._cancel.is_set() and not self.finished
+
+    def progress(self, done: int, total: Optional[int] = None):
+        """Progress callback handed to the work; stops it once cancel() was called."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.done, self.total = done, total
+
+    def cancel(self):
+        """Cancels a queued job at once and a running one at its next progress report."""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+
+
+class JobExecutor:
+    """Process-wide thread pool running Jobs for every session.
+
+    Jobs submitted with a key are shared: while a job with the same kind and
+    key is queued, running or done, submit() returns it instead of starting
+    the work again, so its result doubles as a cache.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, keep: int = MAX_FINISHED_JOBS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tracker-job")
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._by_key = {}
+
+    def submit(self, kind: str, fn: Callable, *args, key=None, label: str = "", **kwargs) -> Job:
+        """Runs fn(*args, progress=job.progress, **kwargs) in the pool."""
+        with self._lock:
+            if key is not None:
+                existing = self._jobs.get(self._by_key.get((kind, key)))
+                if existing is not None and existing.status in ("queued", "running", "done"):
+                    return existing
+            job = Job(kind, key, label)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[(kind, key)] = job.id
+            self._prune()
+            job._future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            return
+        job.status = "running"
+        try:
+            with span(f"job.{job.kind}"):
+                job.result = fn(*args, progress=job.progress, **kwargs)
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self._keep)]:
+            del self._jobs[job.id]
+            if self._by_key.get((job.kind, job.key)) == job.id:
+                del self._by_key[(job.kind, job.key)]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_executor() -> JobExecutor:
+    """One executor per process, shared by all sessions."""
+    return JobExecutor()
+
+
+def submit_job(slot: str, kind: str, fn: Callable, *args, key=None, label: str = "", **kwargs) -> Job:
+    """Submits a job and remembers it as this session's job in slot."""
+    job = get_job_executor().submit(kind, fn, *args, key=key, label=label, **kwargs)
+    st.session_state.setdefault("_jobs", {})[slot] = job.id
+    return job
+
+
+def session_job(slot: str) -> Optional[Job]:
+    job_id = st.session_state.get("_jobs", {}).get(slot)
+    return get_job_executor().get(job_id) if job_id else None
+
+
+def forget_job(slot: str):
+    st.session_state.get("_jobs", {}).pop(slot, None)
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def job_progress(slot: str):
+    """Polls the session's job in slot and reruns the page once it has finished.
+
+    Only this fragment reruns while the job works, so the rest of the page
+    stays interactive. Show it only while the job is not finished yet.
+    """
+    job = session_job(slot)
+    if job is None:
+        return
+    if job.finished:
+        st.rerun()
+    if job.total:
+        st.progress(min(job.done / job.total, 1.0), text=f"{job.label}: {job.done} of {job.total}")
+    else:
+        st.progress(0.0, text=f"{job.label}..." if job.status == "running" else f"{job.label} (queued)")
+    if st.button("Cancel", key=f"{slot}_job_cancel", disabled=job.cancelling):
+        job.cancel()
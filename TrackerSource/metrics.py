@@ -0,0 +1,43 @@
+import streamlit as st
+from typing import Dict
+
+from database import build_tracker_filter, get_connection_manager, get_data_from_db, table_revision
+from profiling import timed
+
+# Metric bucket of every homologation status. Statuses that are not listed
+# here (PRODUCT N/A, GOT PRODUCT, .DOC, empty) count as "missing".
+STATUS_BUCKETS = {
+    "✅ PASSED": "passed",
+    "❌ FAILED": "failed",
+    "⏳AWAIT R&D": "awaiting_rd",
+    "⚙️ FACTORY": "factory",
+    "🛠️FUNCTION": "ongoing",
+    "📡 EMC RADIATED": "ongoing",
+    "⚡ EMC CONDUCTED": "ongoing",
+}
+BUCKETS = ("passed", "failed", "awaiting_rd", "factory", "ongoing", "missing")
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def status_counts(where: str, params: tuple, revision: int) -> Dict[str, int]:
+    """Rows per Homologated value in one GROUP BY query, cached per table revision."""
+    counts = get_data_from_db(
+        f"SELECT Homologated, count(*) AS n FROM ValidationTracker {where} GROUP BY Homologated",
+        list(params),
+    )
+    return {status: int(n) for status, n in zip(counts["Homologated"], counts["n"])}
+
+
+def bucket_counts(counts: Dict[str, int]) -> Dict[str, int]:
+    """Folds per-status counts into the buckets shown in the metrics row."""
+    buckets = dict.fromkeys(BUCKETS, 0)
+    for status, n in counts.items():
+        buckets[STATUS_BUCKETS.get(status, "missing")] += n
+    buckets["total"] = sum(counts.values())
+    return buckets
+
+
+@timed("metrics")
+def status_metrics(filters: Dict) -> Dict[str, int]:
+    """Metric buckets for the rows matching the tracker filters."""
+    where, params = build_tracker_filter(filters, get_connection_manager().use_fts)
+    return bucket_counts(status_counts(where, tuple(params), table_revision()))
@@ -0,0 +1,228 @@
+"""Batch ingestion of validation plans (.docx) into ValidationPlan/ValidationTestCase.
+
+    python plan_ingest.py plans/            # a folder, searched recursively
+    python plan_ingest.py plans.zip --workers 4
+"""
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from docx import Document
+
+from database import bump_revision, get_connection_manager
+
+# Metadata rows that may name the tracker request, most specific first
+REQUEST_FIELDS = ("request", "request_id", "project_part")
+
+
+def read_plan_tables(data: bytes) -> Tuple[Dict, list]:
+    """Reads the metadata and "Test Case ID" tables of a validation plan.
+
+    Tables are scanned once, stopping as soon as both tables have been found.
+    """
+    doc = Document(io.BytesIO(data))
+    metadata = None
+    test_cases = None
+
+    for table in doc.tables:
+        columns = len(table.columns)
+        if metadata is None and columns == 2:
+            metadata = {}
+            for row in table.rows:
+                key, value = [cell.text.strip() for cell in row.cells][:2]
+                metadata[key.lower().replace(" ", "_")] = value
+        elif test_cases is None and columns == 3:
+            rows = iter(table.rows)
+            header = next(rows, None)
+            if header is None or header.cells[0].text.strip() != "Test Case ID":
+                continue
+            test_cases = []
+            for row in rows:
+                test_id, objective, result = [cell.text.strip() for cell in row.cells][:3]
+                test_cases.append({"id": test_id, "objective": objective, "result": result})
+        if metadata is not None and test_cases is not None:
+            break
+
+    return metadata or {}, test_cases or []
+
+
+def _is_plan(name: str) -> bool:
+    name = Path(name).name
+    return name.lower().endswith(".docx") and not name.startswith("~$")  # ~$: Word lock files
+
+
+def _is_folder(source) -> bool:
+    return isinstance(source, (str, os.PathLike)) and Path(source).is_dir()
+
+
+def count_documents(source) -> int:
+    """Number of .docx iter_documents() will yield, without reading them."""
+    if _is_folder(source):
+        return sum(1 for path in Path(source).rglob("*.docx") if _is_plan(path.name))
+    with zipfile.ZipFile(source) as archive:
+        count = sum(1 for info in archive.infolist() if not info.is_dir() and _is_plan(info.filename))
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return count
+
+
+def iter_documents(source) -> Iterator[Tuple[str, bytes]]:
+    """Yields (name, bytes) for every .docx in a folder, a zip path or an uploaded zip."""
+    if _is_folder(source):
+        for path in sorted(Path(source).rglob("*.docx")):
+            if _is_plan(path.name):
+                yield str(path.relative_to(source)), path.read_bytes()
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and _is_plan(info.filename):
+                yield info.filename, archive.read(info)
+
+
+def _parse(item: Tuple[str, str, bytes]):
+    """Worker: parses one document, returning the error text instead of raising."""
+    name, digest, data = item
+    try:
+        metadata, test_cases = read_plan_tables(data)
+        return name, digest, metadata, test_cases, None
+    except Exception as e:
+        return name, digest, None, None, f"{type(e).__name__}: {e}"
+
+
+def _linked_request(conn, metadata: Dict) -> Optional[str]:
+    """The tracker Request named by the plan metadata, as stored in the tracker."""
+    for field in REQUEST_FIELDS:
+        value = (metadata.get(field) or "").strip()
+        if not value:
+            continue
+        row = conn.execute(
+            "SELECT Request FROM ValidationTracker WHERE trim(Request) = ? LIMIT 1", (value,)
+        ).fetchone()
+        if row:
+            return row[0]
+    return (metadata.get("request") or metadata.get("request_id") or "").strip() or None
+
+
+def _store(conn, name, digest, metadata, test_cases):
+    cursor = conn.execute(
+        """
+        INSERT INTO ValidationPlan (ContentHash, FileName, Request, Metadata) VALUES (?, ?, ?, ?)
+        ON CONFLICT(ContentHash) DO NOTHING
+        """,
+        (digest, name, _linked_request(conn, metadata), json.dumps(metadata, ensure_ascii=False)),
+    )
+    if not cursor.rowcount:
+        return False  # the same document appeared twice in this batch
+    conn.executemany(
+        "INSERT INTO ValidationTestCase (PlanID, Position, TestID, Objective, Result) VALUES (?, ?, ?, ?, ?)",
+        [
+            (cursor.lastrowid, position, case["id"], case["objective"], case["result"])
+            for position, case in enumerate(test_cases)
+        ],
+    )
+    return True
+
+
+def ingest_plans(
+    source,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    db_name: Optional[str] = None,
+) -> Dict:
+    """Parses every new .docx of a folder or zip in a process pool and stores it.
+
+    Files whose SHA-256 is already in ValidationPlan are skipped without being
+    parsed. Files are hashed and handed to the pool as they are read, with at
+    most two per worker waiting, so only those are held in memory. The parsed
+    plans are then written in one short transaction: the tracker stays
+    writable while the files parse. A file that fails to parse is reported and
+    does not stop the batch. If progress raises, nothing is written.
+    """
+    started = time.perf_counter()
+    manager = get_connection_manager(db_name)
+    with manager.reader() as conn:
+        known = {digest for (digest,) in conn.execute("SELECT ContentHash FROM ValidationPlan")}
+
+    result = {"files": 0, "stored": 0, "skipped": 0, "failed": []}
+    total = count_documents(source)
+    parsed = []
+    if total:
+        workers = workers or min(total, os.cpu_count() or 1)
+        queued, in_flight = set(), deque()
+
+        def report():
+            if progress:
+                progress(result["files"] - len(in_flight), total)
+
+        def collect(future):
+            name, digest, metadata, test_cases, error = future.result()
+            if error:
+                result["failed"].append(f"{name}: {error}")
+            else:
+                parsed.append((name, digest, metadata, test_cases))
+            report()
+
+        # spawn: forking the app's process would copy its threads' locks mid-use
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            try:
+                for name, data in iter_documents(source):
+                    result["files"] += 1
+                    digest = hashlib.sha256(data).hexdigest()
+                    if digest in known or digest in queued:
+                        result["skipped"] += 1
+                        report()
+                        continue
+                    queued.add(digest)
+                    in_flight.append(pool.submit(_parse, (name, digest, data)))
+                    while len(in_flight) >= workers * 2:
+                        collect(in_flight.popleft())
+                while in_flight:
+                    collect(in_flight.popleft())
+            except BaseException:
+                # e.g. a cancelled job: do not wait for the files not parsed yet
+                pool.shutdown(cancel_futures=True)
+                raise
+
+    if parsed:
+        with manager.transaction(source="plan_import") as conn:
+            for name, digest, metadata, test_cases in parsed:
+                if _store(conn, name, digest, metadata, test_cases):
+                    result["stored"] += 1
+            bump_revision(conn, "ValidationPlan")
+
+    result["seconds"] = time.perf_counter() - started
+    result["files_per_second"] = result["files"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a folder or zip of validation plan .docx files.")
+    parser.add_argument("source", help="folder (searched recursively) or .zip of .docx files")
+    parser.add_argument("--db", default=None, help="SQLite database file (default: DB_PATH or project_tracker.db)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    result = ingest_plans(args.source, workers=args.workers, db_name=args.db)
+    print(
+        f"{result['files']} files: {result['stored']} stored, {result['skipped']} already known, "
+        f"{len(result['failed'])} failed in {result['seconds']:.1f}s "
+        f"({result['files_per_second']:.1f} files/s)"
+    )
+    for failure in result["failed"]:
+        print(f"  {failure}")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+import functools
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+# Off unless TRACKER_PROFILE=1 or switched on from the admin panel; when off,
+# an instrumented call costs one global lookup and a branch.
+ENABLED = os.environ.get("TRACKER_PROFILE") == "1"
+# Kept out of the source tree (report_log.json there is tracked by git)
+LOG_PATH = Path(os.environ.get("TRACKER_PROFILE_LOG") or Path(tempfile.gettempdir()) / "tracker_profile.jsonl")
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+_log_file = None
+
+
+def set_enabled(enabled: bool):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+
+def _record(name: str, seconds: float, counters: dict):
+    global _log_file
+    with _lock:
+        entry = _stats.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        for key, value in counters.items():
+            entry[key] = entry.get(key, 0) + value
+        try:
+            if _log_file is None:
+                _log_file = open(LOG_PATH, "a", encoding="utf-8", buffering=1)
+            event = {"ts": datetime.now().isoformat(timespec="milliseconds"), "name": name, "seconds": round(seconds, 6)}
+            _log_file.write(json.dumps({**event, **counters}, ensure_ascii=False) + "\n")
+        except OSError:
+            pass  # a read-only log location must not break the app
+
+
+@contextmanager
+def span(name: str):
+    """Times the block; count() calls inside it are attached to it."""
+    if not ENABLED:
+        yield
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    counters = {}
+    stack.append(counters)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stack.pop()
+        _record(name, time.perf_counter() - started, counters)
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(**values):
+    """Adds counters (rows_read, rows_written, bytes...) to the innermost span."""
+    if not ENABLED:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        counters = stack[-1]
+        for key, value in values.items():
+            counters[key] = counters.get(key, 0) + int(value)
+
+
+def stats() -> pd.DataFrame:
+    """One row per instrumented name, slowest total first."""
+    with _lock:
+        rows = [{"name": name, **entry} for name, entry in _stats.items()]
+    if not rows:
+        return pd.DataFrame(columns=["name", "calls", "total_ms", "mean_ms", "max_ms"])
+    frame = pd.DataFrame(rows).fillna(0)
+    frame["total_ms"] = frame.pop("seconds") * 1000
+    frame["mean_ms"] = frame["total_ms"] / frame["calls"]
+    frame["max_ms"] = frame.pop("max_seconds") * 1000
+    return frame.sort_values("total_ms", ascending=False)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def is_admin() -> bool:
+    """Whether this session gets the admin panels (profiling).
+
+    TRACKER_ADMIN=1 shows them to everyone; otherwise TRACKER_ADMIN_TOKEN must
+    be set and the session opened with ?admin=<token>.
+    """
+    if os.environ.get("TRACKER_ADMIN") == "1":
+        return True
+    token = os.environ.get("TRACKER_ADMIN_TOKEN")
+    supplied = st.query_params.get("admin")
+    return bool(token and supplied) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def profiling_panel():
+    """Admin sidebar panel: switch profiling on and see where the time goes."""
+    with st.expander("⏱️ Profiling"):
+        enabled = st.toggle("Record timings", value=ENABLED, key="profiling_enabled")
+        if enabled != ENABLED:
+            set_enabled(enabled)
+        st.caption(f"Events are appended to {LOG_PATH} (TRACKER_PROFILE_LOG)")
+        st.dataframe(stats(), hide_index=True)
+        if st.button("Reset", key="profiling_reset"):
+            reset()
+            st.rerun()
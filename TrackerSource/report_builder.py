@@ -0,0 +1,290 @@
+"""Homologation report (.docx) builder, independent of Streamlit.
+
+    python report_builder.py --status "✅ PASSED" --out reports.zip
+"""
+import argparse
+import copy
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt
+from PIL import Image
+
+LOGO_PATH = Path(__file__).with_name("premium_psu_logo.png")
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Component type of a tracker row, guessed from the words of its Current/New parts
+COMPONENT_KEYWORDS = {
+    "MOSFET": ("mosfet", "mos n", "mos p"),
+    "Diode": ("diode", "schottky"),
+    "Inductor": ("inductor", "choke"),
+    "Connector": ("connector",),
+    "DC-DC Converter": ("dc-dc", "dc/dc"),
+    "Capacitor": ("capacitor",),
+}
+
+
+def _hyperlink_run():
+    run = OxmlElement('w:r')
+    rPr = OxmlElement('w:rPr')
+    color = OxmlElement('w:color')
+    color.set(qn('w:val'), '0000FF')
+    rPr.append(color)
+    underline = OxmlElement('w:u')
+    underline.set(qn('w:val'), 'single')
+    rPr.append(underline)
+    run.append(rPr)
+    run.append(OxmlElement('w:t'))
+    return run
+
+
+# Blue, underlined run copied for every link instead of rebuilding its nodes
+HYPERLINK_RUN = _hyperlink_run()
+
+
+def add_hyperlink(paragraph, url, text):
+    part = paragraph.part
+    r_id = part.relate_to(url, 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink', is_external=True)
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), r_id)
+    new_run = copy.deepcopy(HYPERLINK_RUN)
+    new_run[-1].text = text
+    hyperlink.append(new_run)
+    paragraph._p.append(hyperlink)
+
+
+@lru_cache(maxsize=4)
+def _logo_png(logo_path) -> bytes:
+    """The logo as PNG bytes, read once per process (converted only if it is not a PNG)."""
+    with Image.open(logo_path) as image:
+        if image.format == "PNG":
+            return Path(logo_path).read_bytes()
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _style_id(name: str) -> str:
+    """Id of a built-in style, resolved once: python-docx scans every style per lookup."""
+    return Document().styles[name].style_id
+
+
+def _add_heading(doc, text, level):
+    paragraph = doc.add_paragraph(text)
+    paragraph._p.style = _style_id(f"Heading {level}")
+    return paragraph
+
+
+@lru_cache(maxsize=4)
+def report_template(logo_path=LOGO_PATH) -> bytes:
+    """Base .docx shared by every report: Normal style and the header table with the logo.
+
+    Built once per process; build_report() only fills in the variable parts.
+    """
+    doc = Document()
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Aptos Narrow'
+    font.size = Pt(11)
+
+    table = doc.add_table(rows=1, cols=3)
+    table.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = table.cell(0, 0).paragraphs[0].add_run()
+    run.add_picture(io.BytesIO(_logo_png(logo_path)), width=Inches(1.2))
+    table.cell(0, 1).paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph()
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _add_comparison_table(doc, records):
+    if not records:
+        return
+    keys = list(records[0].keys())
+    table = doc.add_table(rows=len(records) + 1, cols=len(keys))
+    table._tbl.tblPr.style = _style_id('Table Grid')
+    rows = [keys] + [[str(row_data.get(key, '')) for key in keys] for row_data in records]
+    # Fill the cells' XML directly, one row at a time
+    for tr, values in zip(table._tbl.tr_lst, rows):
+        for tc, value in zip(tr.tc_lst, values):
+            tc.p_lst[0].add_r().text = value
+    for cell in table.rows[0].cells:
+        cell.paragraphs[0].runs[0].bold = True
+
+
+def build_report(data: Dict, logo_path=LOGO_PATH) -> bytes:
+    """Renders a homologation report dict (see HomologationApp.display_form) to .docx bytes."""
+    doc = Document(io.BytesIO(report_template(logo_path)))
+    table = doc.tables[0]
+
+    run_center = table.cell(0, 1).paragraphs[0].add_run(
+        f"{data['product_type']}\nSolicitud de homologación\nCódigos: {data['codigos']}"
+    )
+    run_center.bold = True
+
+    cell_right = table.cell(0, 2)
+    info = (
+        f"Doc ID: {data['doc_id']}\n"
+        f"Edition: {data['edition']}\n"
+        f"Author: {data['author']}\n"
+        f"Date: {data['date']}\n"
+    )
+    cell_right.text = info
+
+    _add_heading(doc, '1. Objetivo', 1)
+    doc.add_paragraph(data['objeto'])
+
+    _add_heading(doc, '2. Motivo de la solicitud', 1)
+    doc.add_paragraph(data.get('motivo', ''))
+
+    _add_heading(doc, '3. Investigativo previo', 1)
+    doc.add_paragraph(data.get('investigativo', ''))
+
+    doc.add_paragraph("Componentes:")
+    for comp in data.get('datasheet_links', []):
+        name = comp.get('name', 'Componente')
+        url = comp.get('url', '')
+        p = doc.add_paragraph()
+        if url.strip():
+            add_hyperlink(p, url, f"[{data['codigos']}] {name}")
+        else:
+            p.add_run(f"[{data['codigos']}] {name}")
+
+    _add_heading(doc, '4. Comparativa parámetros', 1)
+    _add_heading(doc, 'Materiales y características mecánicas', 2)
+    _add_comparison_table(doc, data.get("materiales", []))
+
+    _add_heading(doc, 'Dimensiones', 2)
+    _add_comparison_table(doc, data.get("dimensionado", []))
+
+    _add_heading(doc, '6. Conclusiones', 1)
+    doc.add_paragraph(data.get("conclusion", ""))
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def report_file_name(data: Dict) -> str:
+    return f"Homologacion_{data.get('codigos')}.docx"
+
+
+def _component_type(*texts) -> str:
+    words = " ".join(text or "" for text in texts).lower()
+    for component_type, keywords in COMPONENT_KEYWORDS.items():
+        if any(keyword in words for keyword in keywords):
+            return component_type
+    return "Custom"
+
+
+def report_from_tracker_row(row: Dict, author: str = "", report_date: Optional[date] = None) -> Dict:
+    """Report dict for one tracker row; its Request reads '<doc id>_<códigos>'."""
+    request = (row.get("Request") or "").strip()
+    doc_id, _, codigos = request.partition("_")
+    current = (row.get("Current") or "").strip()
+    new = (row.get("New") or "").strip()
+    return {
+        "product_type": _component_type(current, new),
+        "doc_id": f"H-{doc_id}",
+        "edition": "1",
+        "codigos": codigos.strip() or doc_id,
+        "date": (report_date or date.today()).strftime("%d.%m.%Y"),
+        "author": author,
+        "objeto": f"Se estudia la posibilidad de homologar el componente {new} como alternativa a {current}.",
+        "motivo": f"Productos: {(row.get('Product') or '').strip()}\nPosición: {(row.get('Position') or '').strip()}",
+        "investigativo": f"El componente que se compraba hasta ahora es {current}.",
+        "datasheet_links": [{"name": name, "url": ""} for name in (current, new) if name],
+        "materiales": [],
+        "dimensionado": [],
+        "conclusion": f"{row.get('Homologated') or ''} {row.get('Note') or ''}".strip(),
+    }
+
+
+def tracker_reports(conn, statuses: Iterable[str], author: str = "") -> List[Dict]:
+    """Report dicts for every tracker row whose Homologated status is in statuses."""
+    statuses = list(statuses)
+    placeholders = ", ".join("?" for _ in statuses)
+    cursor = conn.execute(
+        f"SELECT * FROM ValidationTracker WHERE Homologated IN ({placeholders}) ORDER BY Request",
+        statuses,
+    )
+    columns = [col[0] for col in cursor.description]
+    return [report_from_tracker_row(dict(zip(columns, row)), author) for row in cursor]
+
+
+def write_reports_zip(
+    reports: List[Dict],
+    out: BinaryIO,
+    workers: Optional[int] = None,
+    logo_path=LOGO_PATH,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Builds the reports in worker processes and streams them into a zip.
+
+    Documents are written as they come back from the pool, so only the
+    documents in flight are held in memory. progress(done, total) is called
+    after each one; if it raises, the reports not started yet are dropped.
+    Returns the number written.
+    """
+    names = set()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        if not reports:
+            return 0
+        workers = workers or min(len(reports), os.cpu_count() or 1)
+        # spawn: forking the app's process would copy its threads' locks mid-use
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            chunksize = max(1, len(reports) // (workers * 4))
+            documents = pool.map(partial(build_report, logo_path=logo_path), reports, chunksize=chunksize)
+            try:
+                for data, document in zip(reports, documents):
+                    name = report_file_name(data)
+                    stem, suffix = name.rsplit(".", 1)
+                    duplicate = 1
+                    while name in names:  # several rows can share the same códigos
+                        duplicate += 1
+                        name = f"{stem}_{duplicate}.{suffix}"
+                    names.add(name)
+                    archive.writestr(name, document)
+                    if progress:
+                        progress(len(names), len(reports))
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+    return len(names)
+
+
+def main(argv=None):
+    from database import DB_NAME, get_connection_manager
+
+    parser = argparse.ArgumentParser(description="Build homologation reports for tracker rows into a zip.")
+    parser.add_argument("--status", action="append", help="Homologated status to include (repeatable, default: ✅ PASSED)")
+    parser.add_argument("--out", default="homologation_reports.zip", help="zip file to write")
+    parser.add_argument("--author", default="", help="author printed in the report header")
+    parser.add_argument("--db", default=DB_NAME, help=f"SQLite database file (default: {DB_NAME}, from DB_PATH)")
+    parser.add_argument("--workers", type=int, default=None, help="builder processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    with get_connection_manager(args.db).reader() as conn:
+        reports = tracker_reports(conn, args.status or ["✅ PASSED"], args.author)
+    with open(args.out, "wb") as out:
+        written = write_reports_zip(reports, out, workers=args.workers)
+    print(f"{written} reports written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
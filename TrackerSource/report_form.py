@@ -1,16 +1,18 @@
+import copy
+import json
+
 import streamlit as st
 import pandas as pd
-import docx
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.oxml import OxmlElement
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-import io, os, html
-from datetime import date
+from datetime import date, datetime
 from io import BytesIO
-from PIL import Image
-from st_aggrid import AgGrid, GridOptionsBuilder
+
+from database import HOMOLOGATION_OPTIONS, get_connection_manager, table_revision
+from drafts import autosave_form, drafts_panel
+from jobs import forget_job, job_progress, session_job, submit_job
+from ui_state import keep_widget_state
+
+# report_builder (python-docx, Pillow) and st_aggrid are imported when a
+# document is built or the grid is shown, not when the page first renders
 
 # Predefined comparison fields per component type
 PRODUCT_COMPARISON_FIELDS = {
@@ -80,6 +82,34 @@ PRODUCT_COMPARISON_FIELDS = {
 }
 
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def comparison_skeleton(product_type: str, section: str, comp_names: tuple) -> pd.DataFrame:
+    """Empty comparison table: one row per field of the section, one column per component."""
+    fields = PRODUCT_COMPARISON_FIELDS[product_type][section]
+    return pd.DataFrame(
+        [[field] + [""] * len(comp_names) for field in fields],
+        columns=["Field", *comp_names],
+        dtype=object,
+    )
+
+
+def tracker_reports_zip(statuses: tuple, author: str, progress=None):
+    """(reports written, zip bytes) for the tracker rows with the given statuses."""
+    from report_builder import tracker_reports, write_reports_zip
+
+    with get_connection_manager().reader() as conn:
+        reports = tracker_reports(conn, statuses, author)
+    buffer = BytesIO()
+    written = write_reports_zip(reports, buffer, progress=progress)
+    return written, buffer.getvalue()
+
+
+def report_docx(data: dict, logo_path=None, progress=None):
+    """(file name, .docx bytes) of one homologation report."""
+    from report_builder import LOGO_PATH, build_report, report_file_name
+
+    return report_file_name(data), build_report(data, logo_path or LOGO_PATH)
+
 
 class HomologationApp:
     def __init__(self):
@@ -87,26 +117,47 @@ class HomologationApp:
             st.session_state.report_data = {}
 
     def add_hyperlink(self, paragraph, url, text):
-        part = paragraph.part
-        r_id = part.relate_to(url, 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink', is_external=True)
-        hyperlink = OxmlElement('w:hyperlink')
-        hyperlink.set(qn('r:id'), r_id)
-        new_run = OxmlElement('w:r')
-        rPr = OxmlElement('w:rPr')
-        color = OxmlElement('w:color')
-        color.set(qn('w:val'), '0000FF')
-        rPr.append(color)
-        underline = OxmlElement('w:u')
-        underline.set(qn('w:val'), 'single')
-        rPr.append(underline)
-        new_run.append(rPr)
-        text_elem = OxmlElement('w:t')
-        text_elem.text = text
-        new_run.append(text_elem)
-        hyperlink.append(new_run)
-        paragraph._p.append(hyperlink)
+        from report_builder import add_hyperlink
+
+        add_hyperlink(paragraph, url, text)
+
+    def open_draft(self, loaded):
+        """Loads a draft into report_data and the datasheet link inputs."""
+        st.session_state.report_data = loaded
+        links = loaded.get('datasheet_links') or []
+        for i in range(5):
+            link = links[i] if i < len(links) else {}
+            st.session_state[f"name_{i}"] = link.get('name', "")
+            st.session_state[f"url_{i}"] = link.get('url', "")
+        # The editors restart from the draft's tables, see table_seed()
+        for name in ("materiales", "dimensionado"):
+            st.session_state.pop(f"{name}_editor", None)
+            st.session_state.pop(f"{name}_seed", None)
+
+    def table_seed(self, name, skeleton):
+        """Rows a comparison editor starts from.
+
+        While the editor is on screen the same frame is returned, so its edits
+        are kept. When the page is opened again the editor starts from the
+        rows saved in report_data instead of the empty skeleton.
+        """
+        seed_key = f"{name}_seed"
+        mounted = f"{name}_editor" in st.session_state
+        signature = (tuple(skeleton.columns), tuple(skeleton["Field"]))
+        seed = st.session_state.get(seed_key)
+        if mounted and seed is not None and seed[0] == signature:
+            return seed[1]
+
+        records = st.session_state.report_data.get(name) or []
+        frame = skeleton
+        if not mounted and records and set(records[0]) == set(skeleton.columns):
+            frame = pd.DataFrame(records, columns=skeleton.columns)
+        st.session_state[seed_key] = (signature, frame)
+        return frame
 
     def editable_table_aggrid(self, df, key):
+        from st_aggrid import AgGrid, GridOptionsBuilder
+
         gb = GridOptionsBuilder.from_dataframe(df)
         gb.configure_default_column(editable=True)
         grid_options = gb.build()
@@ -114,32 +165,43 @@ class HomologationApp:
         return pd.DataFrame(grid_response['data'])
 
     def display_form(self):
-        logo_path = "TrackerSource/premium_psu_logo.png"
         data = st.session_state.report_data
+        keep_widget_state(*(f"{field}_{i}" for field in ("name", "url") for i in range(5)))
+
+        with st.expander("🗂️ Drafts"):
+            drafts_panel("report", self.open_draft)
 
         col1, col2 = st.columns(2)
 
         with col1:
             with st.expander("General Information", expanded=True):
                 cols = st.columns(3)
-                data['product_type'] = cols[0].selectbox("Component Type", list(PRODUCT_COMPARISON_FIELDS.keys()))
-                data['doc_id'] = cols[1].text_input("Document ID", "H-2025-133")
-                data['edition'] = cols[2].text_input("Edition", "2")
+                product_types = list(PRODUCT_COMPARISON_FIELDS.keys())
+                data['product_type'] = cols[0].selectbox(
+                    "Component Type", product_types,
+                    index=product_types.index(data['product_type']) if data.get('product_type') in product_types else 0,
+                )
+                data['doc_id'] = cols[1].text_input("Document ID", data.get('doc_id', "H-2025-133"))
+                data['edition'] = cols[2].text_input("Edition", data.get('edition', "2"))
                 cols2 = st.columns(3)
-                data['codigos'] = cols2[0].text_input("Códigos", "26010206")
-                data['date'] = cols2[1].date_input("Date", value=date.today()).strftime("%d.%m.%Y")
-                data['author'] = cols2[2].text_input("Author", "V.Mocanu")
+                data['codigos'] = cols2[0].text_input("Códigos", data.get('codigos', "26010206"))
+                try:
+                    report_date = datetime.strptime(data.get('date', ""), "%d.%m.%Y").date()
+                except ValueError:
+                    report_date = date.today()
+                data['date'] = cols2[1].date_input("Date", value=report_date).strftime("%d.%m.%Y")
+                data['author'] = cols2[2].text_input("Author", data.get('author', "V.Mocanu"))
 
             with st.expander("Objecto", expanded=True):
-                data['objeto'] = st.text_area("Objecto", "Se estudia la posibilidad de homologar el componente...")
+                data['objeto'] = st.text_area("Objecto", data.get('objeto', "Se estudia la posibilidad de homologar el componente..."))
 
             with st.expander("Motivo", expanded=True):
-                data['motivo'] = st.text_area("Motivo", "Solicitante:\nMotivo:")
+                data['motivo'] = st.text_area("Motivo", data.get('motivo', "Solicitante:\nMotivo:"))
 
             with st.expander("Investigativo", expanded=True):
-                data['investigativo'] = st.text_area("Investigativo", "El componente que se compraba hasta ahora es...")
+                data['investigativo'] = st.text_area("Investigativo", data.get('investigativo', "El componente que se compraba hasta ahora es..."))
 
-            num_links = st.slider("Número de componentes a comparar", 1, 5, 2)
+            num_links = st.slider("Número de componentes a comparar", 1, 5, len(data.get('datasheet_links') or [None, None]))
             data['datasheet_links'] = []
             for i in range(num_links):
                 name = st.text_input(f"Nombre del componente {i+1}", key=f"name_{i}")
@@ -156,26 +218,16 @@ class HomologationApp:
 
             # --- Comparison Tables ---
             with st.expander("Comparison Tables", expanded=True):
-                comp_names = [comp['name'] for comp in data['datasheet_links']]
+                comp_names = tuple(comp['name'] for comp in data['datasheet_links'])
 
                 # --- Materiales Table ---
-                materiales_fields = PRODUCT_COMPARISON_FIELDS[data['product_type']]['materiales']
-                materiales_df = pd.DataFrame(columns=["Field"] + comp_names)
-                for field in materiales_fields:
-                    row = {"Field": field}
-                    row.update({name: "" for name in comp_names})
-                    materiales_df.loc[len(materiales_df)] = row
+                materiales_df = self.table_seed("materiales", comparison_skeleton(data['product_type'], "materiales", comp_names))
 
                 st.markdown("### ✏️ Materiales Editor")
                 edited_materiales_df = st.data_editor(materiales_df, num_rows="dynamic", use_container_width=True, key="materiales_editor")
 
                 # --- Dimensionado Table ---
-                dimensionado_fields = PRODUCT_COMPARISON_FIELDS[data['product_type']]['dimensionado']
-                dimensionado_df = pd.DataFrame(columns=["Field"] + comp_names)
-                for field in dimensionado_fields:
-                    row = {"Field": field}
-                    row.update({name: "" for name in comp_names})
-                    dimensionado_df.loc[len(dimensionado_df)] = row
+                dimensionado_df = self.table_seed("dimensionado", comparison_skeleton(data['product_type'], "dimensionado", comp_names))
 
                 st.markdown("### ✏️ Dimensionado Editor")
                 edited_dimensionado_df = st.data_editor(dimensionado_df, num_rows="dynamic", use_container_width=True, key="dimensionado_editor")
@@ -188,7 +240,7 @@ class HomologationApp:
 
                 # --- Conclusion ---
                 with st.expander("Conclusion", expanded=True):
-                    data['conclusion'] = st.text_area("Conclusión", "El componente propuesto tiene un diseño con mismas dimensiones de las opciones homologadas.")
+                    data['conclusion'] = st.text_area("Conclusión", data.get('conclusion', "El componente propuesto tiene un diseño con mismas dimensiones de las opciones homologadas."))
 
             # --- Live Preview ---
             with col2:
@@ -210,113 +262,84 @@ class HomologationApp:
                 st.markdown(data['investigativo'].replace("\n", "<br>"), unsafe_allow_html=True)
 
                 st.markdown("**Materiales y características mecánicas**")
-                st.table(clean_materiales_df)
+                st.dataframe(clean_materiales_df, hide_index=True)
 
                 st.markdown("**Dimensiones**")
-                st.table(clean_dimensionado_df)
+                st.dataframe(clean_dimensionado_df, hide_index=True)
 
                 st.markdown("#### 6. Conclusiones")
                 st.markdown(data['conclusion'])
 
             # --- Generate DOCX ---
-            if st.button("Generate DOCX Report"):
-                self.generate_doc(data, logo_path)
-
-    def generate_doc(self, data, logo_path):
-        doc = Document()
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = 'Aptos Narrow'
-        font.size = Pt(11)
-
-        table = doc.add_table(rows=1, cols=3)
-        table.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        cell_logo = table.cell(0, 0)
-        image = Image.open(logo_path)
-        buffer = BytesIO()
-        image.save(buffer, format="PNG")
-        buffer.seek(0)
-        run = cell_logo.paragraphs[0].add_run()
-        run.add_picture(buffer, width=Inches(1.2))
-
-        cell_center = table.cell(0, 1)
-        p_center = cell_center.paragraphs[0]
-        p_center.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run_center = p_center.add_run(f"{data['product_type']}\nSolicitud de homologación\nCódigos: {data['codigos']}")
-        run_center.bold = True
-
-        cell_right = table.cell(0, 2)
-        info = (
-            f"Doc ID: {data['doc_id']}\n"
-            f"Edition: {data['edition']}\n"
-            f"Author: {data['author']}\n"
-            f"Date: {data['date']}\n"
-        )
-        cell_right.text = info
-
-        doc.add_paragraph()
-        doc.add_heading('1. Objetivo', level=1)
-        doc.add_paragraph(data['objeto'])
-
-        doc.add_heading('2. Motivo de la solicitud', level=1)
-        doc.add_paragraph(data.get('motivo', ''))
-
-        doc.add_heading('3. Investigativo previo', level=1)
-        doc.add_paragraph(data.get('investigativo', ''))
-
-        doc.add_paragraph("Componentes:", style='Normal')
-        for comp in data.get('datasheet_links', []):
-            name = comp.get('name', 'Componente')
-            url = comp.get('url', '')
-            p = doc.add_paragraph()
-            if url.strip():
-                self.add_hyperlink(p, url, f"[{data['codigos']}] {name}")
-            else:
-                p.add_run(f"[{data['codigos']}] {name}")
-
-        doc.add_heading('4. Comparativa parámetros', level=1)
-        doc.add_heading('Materiales y características mecánicas', level=2)
-        materiales = data.get("materiales", [])
-        if materiales:
-            keys = list(materiales[0].keys())
-            table_mat = doc.add_table(rows=1, cols=len(keys))
-            table_mat.style = 'Table Grid'
-            for i, key in enumerate(keys):
-                cell = table_mat.cell(0, i)
-                cell.text = key
-                cell.paragraphs[0].runs[0].bold = True
-            for row_data in materiales:
-                row = table_mat.add_row().cells
-                for i, key in enumerate(keys):
-                    row[i].text = str(row_data.get(key, ''))
-
-        doc.add_heading('Dimensiones', level=2)
-        dimensionado = data.get("dimensionado", [])
-        if dimensionado:
-            keys = list(dimensionado[0].keys())
-            table_dim = doc.add_table(rows=1, cols=len(keys))
-            table_dim.style = 'Table Grid'
-            for i, key in enumerate(keys):
-                cell = table_dim.cell(0, i)
-                cell.text = key
-                cell.paragraphs[0].runs[0].bold = True
-            for row_data in dimensionado:
-                row = table_dim.add_row().cells
-                for i, key in enumerate(keys):
-                    row[i].text = str(row_data.get(key, ''))
-
-        doc.add_heading('6. Conclusiones', level=1)
-        doc.add_paragraph(data.get("conclusion", ""))
-
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-
+            self.generate_doc(data)
+
+            with st.expander("📦 Batch reports from the tracker"):
+                self.batch_reports()
+
+        autosave_form("report", lambda: st.session_state.report_data)
+
+    def generate_doc(self, data, logo_path=None):
+        """Builds the report in the background, like batch_reports(), and offers it once ready."""
+        job = session_job("report_docx")
+        busy = job is not None and not job.finished
+        if st.button("Generate DOCX Report", disabled=busy):
+            # The form keeps changing data while the job runs, it builds a copy
+            snapshot = copy.deepcopy(data)
+            job = submit_job(
+                "report_docx", "report", report_docx, snapshot, logo_path,
+                key=(json.dumps(snapshot, sort_keys=True, default=str), logo_path), label="Building the report",
+            )
+        if job is None:
+            return
+        if not job.finished:
+            job_progress("report_docx")
+            return
+        if job.status != "done":
+            forget_job("report_docx")
+            if job.error:
+                st.error(f"Error building the report: {job.error}")
+            return
+
+        from report_builder import DOCX_MIME
+
+        file_name, document = job.result
         st.download_button(
             label="Download DOCX",
-            data=buffer,
-            file_name=f"Homologacion_{data.get('codigos')}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            data=document,
+            file_name=file_name,
+            mime=DOCX_MIME
         )
 
-
+    def batch_reports(self):
+        """Zip of reports for every tracker row with the chosen statuses, see report_builder."""
+        statuses = st.multiselect("Homologation status", HOMOLOGATION_OPTIONS, default=["✅ PASSED"], key="batch_report_status")
+        author = st.text_input("Author", st.session_state.report_data.get('author', "V.Mocanu"), key="batch_report_author")
+        job = session_job("batch_reports")
+        busy = job is not None and not job.finished
+        if st.button("Generate reports", key="batch_report_btn", disabled=not statuses or busy):
+            # Built in the background; the same request on unchanged data reuses the zip
+            job = submit_job(
+                "batch_reports", "reports", tracker_reports_zip, tuple(statuses), author,
+                key=(tuple(sorted(statuses)), author, table_revision()), label="Building reports",
+            )
+        if job is None:
+            return
+        if not job.finished:
+            job_progress("batch_reports")
+            return
+        if job.status != "done":
+            forget_job("batch_reports")
+            if job.error:
+                st.error(f"Error building the reports: {job.error}")
+            return
+        written, data = job.result
+        if not written:
+            st.info("No tracker rows with these statuses.")
+            return
+        st.download_button(
+            label=f"Download {written} reports (.zip)",
+            data=data,
+            file_name=f"Homologaciones_{date.today():%Y_%m_%d}.zip",
+            mime="application/zip",
+            key="batch_report_download",
+        )
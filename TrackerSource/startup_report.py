@@ -0,0 +1,99 @@
+"""Import-time report for the app's cold start, with a budget check.
+
+    python startup_report.py                 # top imports by cumulative time
+    python startup_report.py --budget 2.5    # exit 1 if the import takes longer
+
+tests/test_startup.py runs the same checks under pytest.
+
+Imports validation_tracker in a fresh interpreter under -X importtime, the
+way `streamlit run` does before the first paint. The check also fails when
+one of DEFERRED_MODULES was imported by the app at startup, since those
+belong to the views (or the exports) that use them. Modules that Streamlit
+and pandas import themselves (pyarrow, Pillow, plotly's theme) are not held
+against the app.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+APP_MODULE = "validation_tracker"
+# What the tracker page cannot start without; pandas pulls in pyarrow when installed
+BASELINE_MODULES = "streamlit, pandas"
+DEFAULT_BUDGET = 3.0
+# Heavy packages only the planner/report pages, imports or exports need
+DEFERRED_MODULES = ("docx", "PIL", "st_aggrid", "plotly", "sqlalchemy", "openpyxl", "pyarrow")
+
+
+def measure_imports(module: str = APP_MODULE):
+    """Runs `import module` in a child interpreter.
+
+    Returns (wall seconds, [(cumulative us, self us, module name)]).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")])))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here, env=env, capture_output=True, text=True,
+    )
+    seconds = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # name is indented by one extra space per nesting level
+        imports.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return seconds, imports
+
+
+def _packages(imports):
+    return {name.strip().split(".")[0] for _, _, name in imports}
+
+
+def eager_modules(imports, baseline_imports):
+    """DEFERRED_MODULES imported at startup, beyond those the baseline imports itself."""
+    imported = _packages(imports) - _packages(baseline_imports)
+    return [module for module in DEFERRED_MODULES if module in imported]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report and check the app's import time.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="maximum seconds for the cold import")
+    parser.add_argument("--top", type=int, default=25, help="number of top-level packages to list")
+    args = parser.parse_args(argv)
+
+    seconds, imports = measure_imports()
+    baseline_seconds, baseline_imports = measure_imports(BASELINE_MODULES)
+    by_package = {}
+    for _, self_us, name in imports:
+        package = name.strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    print(f"{'ms':>8}  package (own import time of all its modules)")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{self_us / 1000:8.1f}  {package}")
+
+    eager = eager_modules(imports, baseline_imports)
+    print(
+        f"\nimport {APP_MODULE}: {seconds:.2f}s (budget {args.budget:.2f}s), "
+        f"of which {BASELINE_MODULES} alone take {baseline_seconds:.2f}s"
+    )
+
+    failed = False
+    if seconds > args.budget:
+        print(f"FAIL: cold import is {seconds - args.budget:.2f}s over budget")
+        failed = True
+    if eager:
+        print(f"FAIL: imported at startup, should be deferred: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""Connections to the tracker database, which is always SQLite.
+
+DB_PATH selects the database file (relative to the working directory). The
+schema (FTS5, triggers, PRAGMA data_version) and the callers' SQL are
+SQLite's, so there is no other backend.
+Several app processes can share one database: writes are serialized by
+SQLite's lock and concurrent edits are resolved by database.apply_changes().
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DATABASE = "project_tracker.db"
+
+# Applied to every connection: WAL lets readers and the writer work at the
+# same time, busy_timeout waits for a lock instead of failing immediately.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA foreign_keys=ON",
+)
+
+# Idle read connections kept by the pool; busier moments open more
+POOL_SIZE = 8
+
+
+def database_location() -> str:
+    return os.environ.get("DB_PATH") or DEFAULT_DATABASE
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3 connection that remembers the table revisions it last read."""
+
+    revisions = None
+
+
+def _configure(conn):
+    """Autocommit (transactions are opened explicitly) plus PRAGMAS."""
+    conn.isolation_level = None
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+
+
+class SQLiteStorage:
+    """Process-wide SQLite access: one serialized writer and a pool of read connections.
+
+    Streamlit reruns and API requests each run on a new thread, so readers are
+    checked out of the pool for one block and returned, instead of being
+    opened (and configured) per thread.
+    """
+
+    use_fts = False
+
+    def __init__(self, location: str, pool_size: int = POOL_SIZE):
+        self.location = location
+        self._pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.location,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=_Connection,
+        )
+        _configure(conn)
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _checkin(self, conn):
+        if self._idle.qsize() < self._pool_size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def reader(self):
+        """A read connection for the block, taken from the pool and returned after it."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._checkin(conn)
+
+    def revision(self, table_name: str) -> int:
+        """Returns the table's revision counter, re-read only after a commit.
+
+        PRAGMA data_version changes whenever another connection (in this or
+        any other process) commits, so as long as it is unchanged the
+        revisions cached on the pooled connection are still current.
+        """
+        with self.reader() as conn:
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            cached = conn.revisions
+            if cached is None or cached[0] != data_version:
+                rows = conn.execute("SELECT name, revision FROM TableRevision").fetchall()
+                cached = conn.revisions = (data_version, dict(rows))
+        return cached[1].get(table_name, 0)
+
+    def close(self):
+        """Closes the writer and the idle readers."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._writer.close()
+
+    @contextmanager
+    def write_lock(self):
+        """Serializes writers of this process on the shared write connection."""
+        with self._write_lock:
+            yield self._writer
+
+    @contextmanager
+    def transaction(self, source: str = None):
+        """Runs the block in a single BEGIN IMMEDIATE ... COMMIT on the writer.
+
+        source tags the ChangeLog rows written by the block (editor, import...).
+        """
+        with self.write_lock() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE ChangeContext SET Source = ? WHERE ID = 1", (source or "unknown",))
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
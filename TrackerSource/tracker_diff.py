@@ -0,0 +1,123 @@
+import math
+from datetime import date, datetime
+
+import pandas as pd
+
+KEY_COLUMN = "Request"
+ROW_ID = "ID"
+# Bumped on every write of a row; editors send back the one they loaded
+ROW_VERSION = "Version"
+
+
+def to_db_value(value):
+    """Normalizes a DataFrame cell to the value stored in SQLite."""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, str):
+        return value or None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d 00:00:00")
+    if hasattr(value, "item"):
+        return to_db_value(value.item())
+    return value
+
+
+class ChangeSet:
+    """Row-level difference between the loaded rows and the edited rows.
+
+    inserts: list of {column: value} for new rows
+    updates: {row_id: {column: (old, new)}} with only the changed columns
+    deletes: list of row ids that were removed in the editor
+    versions: {row_id: Version} of the updated and deleted rows as loaded
+    """
+
+    def __init__(self, inserts=None, updates=None, deletes=None, versions=None):
+        self.inserts = inserts or []
+        self.updates = updates or {}
+        self.deletes = deletes or []
+        self.versions = versions or {}
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def is_empty(self):
+        return len(self) == 0
+
+    def summary(self):
+        return f"{len(self.inserts)} added, {len(self.updates)} updated, {len(self.deletes)} deleted"
+
+
+def _same(old, new):
+    if old in (None, "") and new in (None, ""):
+        return True
+    return old == new
+
+
+def _records(df: pd.DataFrame, columns):
+    """Yields (row_id, {column: db value}) for each row of the frame."""
+    ids = df[ROW_ID] if ROW_ID in df.columns else pd.Series([None] * len(df), index=df.index)
+    ids = pd.to_numeric(ids, errors="coerce")
+    values = df.reindex(columns=columns)
+    for row_id, row in zip(ids, values.itertuples(index=False, name=None)):
+        row_id = None if pd.isna(row_id) else int(row_id)
+        yield row_id, {col: to_db_value(val) for col, val in zip(columns, row)}
+
+
+def diff_frames(original: pd.DataFrame, edited: pd.DataFrame) -> ChangeSet:
+    """Compares the rows handed to the editor with what the editor returned.
+
+    Rows are matched on the hidden row id, because a Request can span several
+    product rows. Only rows whose values changed end up in the ChangeSet.
+    """
+    columns = [col for col in original.columns if col not in (ROW_ID, ROW_VERSION)]
+    before = {row_id: values for row_id, values in _records(original, columns)}
+
+    changes = ChangeSet()
+    seen = set()
+    for row_id, values in _records(edited, columns):
+        if all(val is None or val == "" for val in values.values()):
+            # Empty rows added with "+" and never filled in
+            if row_id is None:
+                continue
+        if not values.get(KEY_COLUMN):
+            raise ValueError("Every row needs a Request ID.")
+
+        if row_id is None or row_id not in before:
+            changes.inserts.append(values)
+            continue
+
+        seen.add(row_id)
+        old = before[row_id]
+        changed = {col: (old[col], new) for col, new in values.items() if not _same(old[col], new)}
+        if changed:
+            changes.updates[row_id] = changed
+
+    changes.deletes = [row_id for row_id in before if row_id not in seen]
+    if ROW_VERSION in original.columns:
+        loaded = {row_id: values[ROW_VERSION] for row_id, values in _records(original, [ROW_VERSION])}
+        changes.versions = {
+            row_id: loaded[row_id] for row_id in [*changes.updates, *changes.deletes] if loaded.get(row_id) is not None
+        }
+    return changes
+
+
+def merge_changes(change_sets) -> ChangeSet:
+    """Combines the ChangeSets of several editor pages into one."""
+    merged = ChangeSet()
+    for changes in change_sets:
+        merged.inserts.extend(changes.inserts)
+        for row_id, changed in changes.updates.items():
+            merged.updates.setdefault(row_id, {}).update(changed)
+        merged.deletes.extend(row_id for row_id in changes.deletes if row_id not in merged.deletes)
+        for row_id, version in changes.versions.items():
+            merged.versions.setdefault(row_id, version)
+    for row_id in merged.deletes:
+        merged.updates.pop(row_id, None)
+    return merged
+
@@ -0,0 +1,120 @@
+import csv
+import io
+from datetime import datetime
+
+from database import get_connection_manager
+from profiling import count, timed
+
+BATCH_SIZE = 5000
+EXPORT_QUERY = "SELECT * FROM ValidationTracker ORDER BY rowid"
+DATE_COLUMNS = ("Priority", "Closed")
+# Written as int64 to Parquet; every other column is text
+INTEGER_COLUMNS = ("ID", "Version")
+
+# label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_batches(conn, query: str = EXPORT_QUERY, batch_size: int = BATCH_SIZE, progress=None, total=None):
+    """Yields the column names, then lists of at most batch_size rows.
+
+    progress(rows so far, total) is called before each batch is handed out.
+    """
+    cursor = conn.execute(query)
+    columns = [col[0] for col in cursor.description]
+    yield columns
+    done = 0
+    while True:
+        if progress:
+            progress(done, total)
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        done += len(rows)
+        yield rows
+
+
+def write_xlsx(batches, out):
+    """Writes rows into a write-only openpyxl workbook (rows are not kept in memory)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("ValidationData")
+    columns = next(batches)
+    dates = [i for i, col in enumerate(columns) if col in DATE_COLUMNS]
+    sheet.append(columns)
+    for rows in batches:
+        for row in rows:
+            if dates:
+                row = list(row)
+                for i in dates:
+                    row[i] = _parse_date(row[i])
+            sheet.append(row)
+    workbook.save(out)
+
+
+def write_csv(batches, out):
+    # utf-8-sig so Excel shows the status emojis correctly
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(next(batches))
+    for rows in batches:
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+def write_parquet(batches, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def column_type(col):
+        if col in DATE_COLUMNS:
+            return pa.timestamp("s")
+        return pa.int64() if col in INTEGER_COLUMNS else pa.string()
+
+    columns = next(batches)
+    schema = pa.schema([(col, column_type(col)) for col in columns])
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in batches:
+            arrays = []
+            for i, col in enumerate(columns):
+                values = [row[i] for row in rows]
+                if col in DATE_COLUMNS:
+                    arrays.append(pa.array([_parse_date(v) for v in values], type=pa.timestamp("s")))
+                elif col in INTEGER_COLUMNS:
+                    arrays.append(pa.array(values, type=pa.int64()))
+                else:
+                    arrays.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+WRITERS = {"xlsx": write_xlsx, "csv": write_csv, "parquet": write_parquet}
+
+
+@timed("export.build")
+def build_export(extension: str, progress=None) -> bytes:
+    """Streams the tracker table into a file of the given format.
+
+    Runs as a background job (see jobs.py), which also keeps the file per
+    format and table revision; progress is reported per batch of rows.
+    """
+    out = io.BytesIO()
+    with get_connection_manager().reader() as conn:
+        total = conn.execute("SELECT count(*) FROM ValidationTracker").fetchone()[0] if progress else None
+        WRITERS[extension](iter_batches(conn, progress=progress, total=total), out)
+    count(bytes=out.tell())
+    return out.getvalue()
@@ -0,0 +1,29 @@
+import streamlit as st
+
+
+def keep_widget_state(*keys):
+    """Keeps widget values across pages.
+
+    Streamlit drops the state of widgets that were not rendered in a run, so
+    switching page would reset them. Call this at the top of a page, before
+    its widgets are created: values are copied aside while the page is
+    shown and written back when the page is opened again.
+    """
+    saved = st.session_state.setdefault("_kept_widget_state", {})
+    for key in keys:
+        if key in st.session_state:
+            saved[key] = st.session_state[key]
+        elif key in saved:
+            st.session_state[key] = saved[key]
+
+
+def flash(slot: str, kind: str, message: str):
+    """Queues a message for show_flash(), so it survives an st.rerun()."""
+    st.session_state.setdefault("_flash_messages", {})[slot] = (kind, message)
+
+
+def show_flash(slot: str):
+    """Shows (once) the message queued for this slot, e.g. with st.success."""
+    kind, message = st.session_state.get("_flash_messages", {}).pop(slot, (None, None))
+    if message:
+        getattr(st, kind)(message)
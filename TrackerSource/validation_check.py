@@ -1,7 +1,10 @@
 import streamlit as st
+import hashlib
 import json
 from datetime import date
-from docx import Document
+
+from drafts import autosave_form, drafts_panel
+from jobs import job_progress, session_job, submit_job
 
 # Predefined standards and test cases
 standards_map = {
@@ -22,43 +25,90 @@ predefined_tests = [
     {"id": "TC007 - EMC TEST", "objective": "ORing position, the MOSFET is always ON, only radiated done"}
 ]
 
+@st.cache_data(max_entries=16, show_spinner=False)
+def parse_validation_docx(digest: str, _data: bytes):
+    """Cached read_plan_tables(), keyed on the SHA-256 digest of the file.
+
+    A document is parsed once however often it is uploaded; the least
+    recently used entries are evicted.
+    """
+    from plan_ingest import read_plan_tables  # python-docx, only once a file is uploaded
+
+    return read_plan_tables(_data)
+
+
 class ValidationChecker:
     def __init__(self):
-        self.metadata = {}
-        self.test_cases = []
+        # Kept in session state so the form survives reruns and page switches
+        self.metadata = st.session_state.setdefault("validation_metadata", {})
+        self.test_cases = st.session_state.setdefault("validation_test_cases", [])
 
     def parse_docx(self, file):
-        doc = Document(file)
-        metadata = {}
-        test_cases = []
-
-        for table in doc.tables:
-            if len(table.columns) == 2:
-                for row in table.rows:
-                    key = row.cells[0].text.strip().lower().replace(" ", "_")
-                    value = row.cells[1].text.strip()
-                    metadata[key] = value
-                break
-
-        for table in doc.tables:
-            if len(table.columns) == 3 and table.rows[0].cells[0].text.strip() == "Test Case ID":
-                for row in table.rows[1:]:
-                    test_cases.append({
-                        "id": row.cells[0].text.strip(),
-                        "objective": row.cells[1].text.strip(),
-                        "result": row.cells[2].text.strip()
-                    })
-                break
-        return metadata, test_cases
+        data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+        return parse_validation_docx(hashlib.sha256(data).hexdigest(), data)
+
+    def draft_data(self):
+        return {**self.metadata, "test_cases": self.test_cases}
+
+    def open_draft(self, loaded):
+        """Loads a draft into the metadata and test cases and resets the test case inputs."""
+        self.test_cases[:] = loaded.pop("test_cases", [])
+        self.metadata.clear()
+        self.metadata.update(loaded)
+        for i in range(len(predefined_tests)):
+            for field in ("id", "obj", "res"):
+                st.session_state.pop(f"{field}_{i}", None)
+
+    def batch_import(self):
+        """Stores every plan of a zip of .docx files in the background, see plan_ingest.ingest_plans()."""
+        archive = st.file_uploader("Zip of .docx validation plans", type=["zip"], key="validation_batch_zip")
+        if archive and st.session_state.get("validation_batch_file") != archive.file_id:
+            st.session_state["validation_batch_file"] = archive.file_id
+            from plan_ingest import ingest_plans
+
+            submit_job(
+                "validation_batch", "plan_import", ingest_plans, archive,
+                key=archive.file_id, label="Parsing validation plans",
+            )
+
+        job = session_job("validation_batch")
+        if job is None:
+            return
+        if not job.finished:
+            job_progress("validation_batch")
+            return
+        if job.status == "cancelled":
+            st.info("Import cancelled, no plan was stored.")
+            return
+        if job.status == "failed":
+            st.error(f"Error importing validation plans: {job.error}")
+            return
+        result = job.result
+        st.success(
+            f"{result['stored']} plans stored, {result['skipped']} already imported "
+            f"({result['files']} files in {result['seconds']:.1f}s, {result['files_per_second']:.1f} files/s)."
+        )
+        if result["failed"]:
+            st.warning("Could not parse:\n\n" + "\n".join(f"- {failure}" for failure in result["failed"]))
 
     def run(self):
         st.title("Validation Plan Generator")
 
+        with st.expander("🗂️ Drafts"):
+            drafts_panel("validation", self.open_draft)
+
         uploaded_doc = st.file_uploader("📤 Upload a .docx file to populate the form", type=["docx"])
-        if uploaded_doc:
-            self.metadata, self.test_cases = self.parse_docx(uploaded_doc)
+        if uploaded_doc and st.session_state.get("validation_parsed_file") != uploaded_doc.file_id:
+            metadata, test_cases = self.parse_docx(uploaded_doc)
+            self.metadata.clear()
+            self.metadata.update(metadata)
+            self.test_cases[:] = test_cases
+            st.session_state["validation_parsed_file"] = uploaded_doc.file_id
             st.success("Document parsed successfully.")
 
+        with st.expander("📦 Batch import validation plans"):
+            self.batch_import()
+
         col1, col2 = st.columns([2, 1])
         with col1:
             with st.form("validation_form"):
@@ -75,23 +125,34 @@ class ValidationChecker:
                 self.metadata["output"] = c5.text_input("Output", value=self.metadata.get("output", ""))
                 self.metadata["efficiency"] = c6.text_input("Efficiency", value=self.metadata.get("efficiency", ""))
 
-                self.metadata["product_type"] = st.selectbox("Product Type", list(standards_map.keys()), index=0)
+                product_types = list(standards_map.keys())
+                stored_type = self.metadata.get("product_type")
+                self.metadata["product_type"] = st.selectbox(
+                    "Product Type", product_types,
+                    index=product_types.index(stored_type) if stored_type in product_types else 0,
+                )
                 self.metadata["standards"] = ", ".join(standards_map.get(self.metadata["product_type"], []))
 
                 c7, c8 = st.columns(2)
                 self.metadata["environment"] = c7.text_input("Test Environment", value=self.metadata.get("environment", ""))
                 self.metadata["engineer"] = c8.text_input("Engineer", value=self.metadata.get("engineer", ""))
 
-                self.metadata["test_date"] = st.date_input("Test Date", value=date.today()).strftime("%Y-%m-%d")
+                try:
+                    test_date = date.fromisoformat(self.metadata.get("test_date", ""))
+                except ValueError:
+                    test_date = date.today()
+                self.metadata["test_date"] = st.date_input("Test Date", value=test_date).strftime("%Y-%m-%d")
                 self.metadata["data_insertion"] = st.text_input("Data Insertion", value=self.metadata.get("data_insertion", ""))
 
                 st.subheader("Test Cases")
-                self.test_cases = []
+                stored_tests = list(self.test_cases)
+                self.test_cases.clear()
                 for i, test in enumerate(predefined_tests):
+                    stored = stored_tests[i] if i < len(stored_tests) else {}
                     t1, t2 = st.columns([1, 3])
-                    test_id = t1.text_input("Test ID", value=test["id"], key=f"id_{i}")
-                    objective = t2.text_input("Objective", value=test["objective"], key=f"obj_{i}")
-                    result = st.text_input("Result", value="", key=f"res_{i}")
+                    test_id = t1.text_input("Test ID", value=stored.get("id", test["id"]), key=f"id_{i}")
+                    objective = t2.text_input("Objective", value=stored.get("objective", test["objective"]), key=f"obj_{i}")
+                    result = st.text_input("Result", value=stored.get("result", ""), key=f"res_{i}")
                     self.test_cases.append({"id": test_id, "objective": objective, "result": result})
 
                 submitted = st.form_submit_button("Generate Validation Plan")
@@ -108,4 +169,6 @@ class ValidationChecker:
         if submitted:
             st.success("Validation plan generated successfully.")
             st.download_button("Download JSON", data=json.dumps({"metadata": self.metadata, "test_cases": self.test_cases}, indent=2),
-                               file_name="validation_plan.json", mime="application/json")
\ No newline at end of file
+                               file_name="validation_plan.json", mime="application/json")
+
+        autosave_form("validation", self.draft_data)
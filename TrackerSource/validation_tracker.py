@@ -1,17 +1,24 @@
-import os, re, shutil, json, sqlite3, plotly
+import sqlite3, math
 import pandas as pd
 import streamlit as st
-from io import BytesIO
 from datetime import datetime
-from sqlalchemy import create_engine
-from typing import List, Dict
-import plotly.figure_factory as ff
-import plotly.graph_objects as go
-import plotly.express as px
+from typing import Dict
 
-from database import *
-from validation_check import *
-from report_form import *
+from database import (
+    HOMOLOGATION_OPTIONS, apply_changes, database, get_data_from_db,
+    request_history, search_tracker_query, table_revision,
+)
+from tracker_diff import ROW_ID, ROW_VERSION, diff_frames, merge_changes
+from metrics import status_metrics
+from tracker_export import EXPORT_FORMATS, build_export
+from jobs import forget_job, job_progress, session_job, submit_job
+from profiling import count, is_admin, profiling_panel, timed
+from ui_state import flash, keep_widget_state, show_flash
+
+# The planner, report and dashboard pages (python-docx, Pillow, st_aggrid,
+# plotly) and the Excel importer (openpyxl) are imported by the view that
+# uses them, so the first paint only pays for the tracker page.
+# startup_report.py checks this.
 
 
 st.set_page_config(
@@ -19,54 +26,87 @@ st.set_page_config(
     layout="wide",
 )
 
-class ValidationTracker:
-    # --- Defined Homologation Options ---
-    HOMOLOGATION_OPTIONS = [
-        "⏳AWAIT R&D", 
-        "🆘PRODUCT N/A", 
-        "🔍GOT PRODUCT", 
-        "🛠️FUNCTION", 
-        "📡 EMC RADIATED", 
-        "⚡ EMC CONDUCTED",
-        "⚙️ FACTORY",
-        "❌ FAILED", 
-        "✅ PASSED",
-        "📋.DOC"
-    ]
+@st.cache_resource(max_entries=16, show_spinner=False)
+def load_tracker_data(query: str, params: tuple, revision: int) -> pd.DataFrame:
+    """Loads and parses the tracker rows once per (query, table revision).
 
-    def __init__(self):
-        database()  # Ensure the multi-table structure and VIEW exist
-        self.query = "SELECT * FROM ValidationTracker"
-        self.data = self.load_data()
-        self.column_config = self.get_column_config()
+    The frame is shared by every session; callers copy it before mutating.
+    """
+    data = get_data_from_db(query, list(params))
 
+    if 'Product_ID' in data.columns:
+        data['Product_ID'] = data['Product_ID'].astype(str)
 
-    
+    # Convert date columns to datetime
+    for date_col in ['Priority', 'Closed']:
+        if date_col in data.columns:
+            data[date_col] = pd.to_datetime(data[date_col], errors='coerce')
 
-    def load_data(self) -> pd.DataFrame:
-        data = get_data_from_db(self.query)
+    return data
 
-        if 'Product_ID' in data.columns:
-            data['Product_ID'] = data['Product_ID'].astype(str)
 
-        # Convert date columns to datetime
-        for date_col in ['Priority', 'Closed']:
-            if date_col in data.columns:
-                data[date_col] = pd.to_datetime(data[date_col], errors='coerce')
+class ValidationTracker:
+    HOMOLOGATION_OPTIONS = HOMOLOGATION_OPTIONS
 
+    PAGE_SIZES = [50, 100, 250, 500]
+    SORT_OPTIONS = {"Row order": None, "Priority": "Priority", "Homologated": "Homologated"}
 
-        return data
+    def __init__(self):
+        database()  # Ensure the multi-table structure and VIEW exist
+        self.column_config = self.get_column_config()
 
-    def display_editor(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Displays the full database in a single data editor without column toggles."""
+    @timed("tracker.filter_page")
+    def page(self, filters: Dict, page: int, page_size: int, sort_by: str = None, descending: bool = False) -> pd.DataFrame:
+        """Returns one page of matching rows, sorted and sliced by SQLite."""
+        query, params = search_tracker_query(
+            filters,
+            sort_by=sort_by,
+            descending=descending,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+        )
+        return load_tracker_data(query, tuple(params), table_revision())
+
+    def edit_page(self, page_df: pd.DataFrame, page_key: str) -> pd.DataFrame:
+        """Shows one page in the editor and keeps its unsaved edits per page.
+
+        Each edited page is stored as (loaded rows, edited rows) in session
+        state, so switching pages does not lose edits and save_pending() can
+        diff every touched page at once.
+        """
+        pending = st.session_state.setdefault("tracker_pending", {})
+        base = st.session_state.get("tracker_page_base")
+        if base is None or base[0] != (page_key, table_revision()):
+            original, edited = pending.get(page_key, (page_df, page_df))
+            st.session_state["tracker_editor_seq"] = st.session_state.get("tracker_editor_seq", 0) + 1
+            base = (page_key, table_revision()), original, edited.copy(), f"editor_main_{st.session_state['tracker_editor_seq']}"
+            st.session_state["tracker_page_base"] = base
+
+        _, original, start, editor_key = base
+        edited_df = self.display_editor(start, key=editor_key)
+
+        try:
+            unchanged = diff_frames(original, edited_df).is_empty()
+        except ValueError:
+            unchanged = False  # e.g. a new row without Request yet
+        if unchanged:
+            pending.pop(page_key, None)
+        else:
+            pending[page_key] = (original, edited_df)
+        return edited_df
 
+    @timed("tracker.data_editor")
+    def display_editor(self, df: pd.DataFrame, key: str = "editor_main") -> pd.DataFrame:
+        """Displays the given rows in a single data editor without column toggles."""
+
+        count(rows=len(df))
         # Show all columns from the DataFrame
         edited_df = st.data_editor(
             df,
             column_config={col: self.column_config.get(col, {}) for col in df.columns},
             hide_index=True,
             num_rows="dynamic",
-            key="editor_main",
+            key=key,
         )
 
         return edited_df
@@ -88,129 +128,173 @@ class ValidationTracker:
             "New": st.column_config.TextColumn("New", disabled=False),
             "Reference": st.column_config.TextColumn("Reference", disabled=False),
             "Product_ID": st.column_config.Column(disabled=True, width="off"),
+            ROW_ID: None,
+            ROW_VERSION: None,
         }
 
 
 
-    def save_changes(self, edited_data: pd.DataFrame):
-        full_data = self.load_data()
+    def save_pending(self, pages=None) -> bool:
+        """Saves the edits of every touched page in one transaction.
 
-        if edited_data.empty:
-            st.warning("No changes to save.")
-            return
+        Returns True on success; the confirmation is queued with flash() so
+        it is still shown after the caller reruns the page.
+        """
+        if pages is None:
+            pages = list(st.session_state.get("tracker_pending", {}).values())
 
-        # Ensure 'Request' column exists
-        if 'Request' not in edited_data.columns:
+        if any('Request' not in edited_data.columns for _, edited_data in pages):
             st.error("Missing 'Request' column in edited data.")
             return
 
-        # Normalize types
-        full_data['Request'] = full_data['Request'].astype(str)
-        edited_data['Request'] = edited_data['Request'].astype(str)
-
-        # Remove deleted rows
-        removed_keys = set(full_data['Request']) - set(edited_data['Request'])
-        if removed_keys:
-            full_data = full_data[~full_data['Request'].isin(removed_keys)]
-
-        # Remove old versions of updated/new rows
-        full_data = full_data[~full_data['Request'].isin(edited_data['Request'])]
-
-        # Append updated and new rows
-        updated_data = pd.concat([full_data, edited_data], ignore_index=True)
-
-        # Persist changes
-        update_data(updated_data)  # Make sure this writes to DB or file
-        st.success("✅ Changes saved successfully!")
-
-
-    def download_backup(self, edited_data: pd.DataFrame):
-        # Always reload full data before exporting
-        full_data = self.load_data()
+        try:
+            changes = merge_changes(diff_frames(original, edited) for original, edited in pages)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
 
-        if full_data is None or full_data.empty:
-            st.error("❌ Cannot download backup: No data available.")
+        if changes.is_empty():
+            st.warning("No changes to save.")
             return
 
-        backup = BytesIO()
         try:
-            with pd.ExcelWriter(backup) as writer:
-                full_data.to_excel(writer, index=False, sheet_name="ValidationData")
-        except Exception as e:
-            st.error(f"An error occurred during Excel creation: {e}")
+            conflicts = apply_changes(changes)
+        except sqlite3.IntegrityError as e:
+            st.error(f"❌ Changes rejected by the database, nothing was saved: {e}")
+            return
+        except sqlite3.OperationalError as e:
+            # e.g. "database is locked": another process held the write lock too long
+            st.error(f"❌ The database is busy, nothing was saved; your edits are kept, try again: {e}")
+            return
+        st.session_state.pop("tracker_pending", None)
+        st.session_state.pop("tracker_page_base", None)
+        if conflicts:
+            requests = sorted({
+                str(request)
+                for original, _ in pages
+                for request in original.loc[original[ROW_ID].isin(conflicts), "Request"]
+            })
+            flash(
+                "tracker_save", "warning",
+                f"⚠️ {len(conflicts)} of {len(changes)} changes were not saved: someone else changed "
+                f"these rows since you opened them ({', '.join(requests[:10])}{', ...' if len(requests) > 10 else ''}). "
+                "They now show the latest values, apply your edits again if still needed.",
+            )
+        else:
+            flash("tracker_save", "success", f"✅ Changes saved successfully! ({changes.summary()})")
+        return True
+
+
+    @timed("export.download_backup")
+    def download_backup(self, edited_data: pd.DataFrame = None):
+        """Builds the backup on request as a background job, shared per format and table revision."""
+        revision = table_revision()
+        label = st.selectbox("Backup format", list(EXPORT_FORMATS), key="tracker_export_format", label_visibility="collapsed")
+        extension, mime = EXPORT_FORMATS[label]
+
+        job = session_job("tracker_export")
+        if job is not None and job.key != (extension, revision):
+            forget_job("tracker_export")  # another format, or the data changed since
+            job = None
+        if job is None:
+            if not st.button("🗂️ Prepare Backup", key="tracker_export_btn"):
+                return
+            job = submit_job(
+                "tracker_export", "export", build_export, extension,
+                key=(extension, revision), label=f"Preparing the {label} backup",
+            )
+        if not job.finished:
+            job_progress("tracker_export")
             return
+        if job.status != "done":
+            forget_job("tracker_export")
+            if job.error:
+                st.error(f"An error occurred during {label} creation: {job.error}")
+            return
+        data = job.result
 
         today = datetime.today().strftime("%Y_%m_%d @ %H:%M")
         st.download_button(
             label="🗂️ Download Backup",
-            data=backup.getvalue(),
-            file_name=f"Validation_{today}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            data=data,
+            file_name=f"Validation_{today}.{extension}",
+            mime=mime
         )
 
 
 #--- DASHBOARD FUNCTIONS ---
 
+# Widgets of the tracker page whose values survive switching page
+TRACKER_WIDGET_KEYS = (
+    "tab_request_search", "tab_product_search", "tab_new_component_search", "tab_note_search",
+    "tab_homo_filter", "tracker_sort", "tracker_descending", "tracker_page_size", "tracker_page",
+    "tracker_export_format", "tracker_history_request",
+)
+
 def display_project_tracker():
+    keep_widget_state(*TRACKER_WIDGET_KEYS)
 
     tracker = ValidationTracker()
-    df = tracker.data.copy()
-   
-    but1, but2 = st.columns(2)
 
+    # Each panel is a fragment: a widget inside one reruns only that panel.
+    # Saving or importing changes the data, so those rerun the whole page.
+    tracker_backup_panel(tracker)
+
+    tracker_workspace(tracker)
+
+    # --- File Upload/DB Population (Stays in Sidebar) ---
+    with st.sidebar:
+        tracker_data_panel()
+
+
+@st.fragment
+def tracker_backup_panel(tracker: ValidationTracker):
+    tracker.download_backup()
+
+
+@st.fragment
+def tracker_workspace(tracker: ValidationTracker):
+    """Search bar and metrics; reruns on every filter keystroke."""
     metric1, metric2, metric3, metric4, metric5, metric6, metric7= st.columns(7)
         
-    col_request, col_product, col_component, col_homologation = st.columns(4)
+    col_request, col_product, col_component, col_note, col_homologation = st.columns(5)
         
     with col_request:
         request_search = st.text_input("Search Request ID", key="tab_request_search")
-        if request_search:
-            df = df[df['Request'].astype(str).str.contains(request_search, case=False, na=False)]
 
     with col_product:
         product_search = st.text_input("Search Product (Used)", key="tab_product_search")
-        if product_search:
-            df = df[df['Product'].astype(str).str.contains(product_search, case=False, na=False)]
 
     with col_component:
         component_search = st.text_input("Search New Component", key="tab_new_component_search")
-        if component_search:
-            df = df[df['New'].astype(str).str.contains(component_search, case=False, na=False)]
 
+    with col_note:
+        note_search = st.text_input("Search Note", key="tab_note_search")
 
     with col_homologation:
         homologated_filter = st.multiselect(
             "Filter by Homologation Status",
             options=tracker.HOMOLOGATION_OPTIONS,
-            default=[],
             key="tab_homo_filter"
         )
-        if homologated_filter:
-            df = df[df['Homologated'].isin(homologated_filter)]
-
-
-    edited_data = tracker.display_editor(df) 
-    
-    with but1:
-        if st.button("📋 Save changes", key="tracker_save_btn"):
-            tracker.save_changes(edited_data)
 
-    with but2:
-        tracker.download_backup(edited_data) 
+    filters = {
+        "Request": request_search,
+        "Product": product_search,
+        "New": component_search,
+        "Note": note_search,
+        "Homologated": homologated_filter,
+    }
 
     # --- Progress Indicator ---
-    total = len(df)
-    passed = len(df[df["Homologated"] == "✅ PASSED"])
-    failed = len(df[df["Homologated"] == "❌ FAILED"])
-    awaitingRD = len(df[df["Homologated"] == "⏳AWAIT R&D"])
-    factory = len(df[df["Homologated"] == "⚙️ FACTORY"])
-
-    # Count entries with FUNCTION or EMC status
-    function_emc = len(df[df["Homologated"].isin([
-            "🛠️FUNCTION", "📡 EMC RADIATED", "⚡ EMC CONDUCTED"
-        ])])
-
-    missing = total - passed - failed - awaitingRD - factory - function_emc
+    counts = status_metrics(filters)
+    total = counts["total"]
+    passed = counts["passed"]
+    failed = counts["failed"]
+    awaitingRD = counts["awaiting_rd"]
+    factory = counts["factory"]
+    function_emc = counts["ongoing"]
+    missing = counts["missing"]
 
     with metric1:
         st.metric("Total Request", value="", delta=total, delta_color="off")
@@ -227,50 +311,119 @@ def display_project_tracker():
         st.metric("Missing Request", value="" ,delta= missing, delta_color="off")
     with metric7:
         st.metric("Ongoing Request", value="", delta=function_emc)
-        
-    # --- File Upload/DB Population (Stays in Sidebar) ---
-    with st.sidebar:
-        st.header("Project Tracker Data Management")
-        uploaded_file = st.file_uploader("Choose an Excel file to Populate DB", type="xlsx", key="tracker_uploader")
-        
-        if uploaded_file:
-            st.info("Reading Excel file...")
-            try:
-                new_df = pd.read_excel(uploaded_file)
-                # Ensure date columns are correct before saving to master
-                for date_col in ['Priority']:
-                    if date_col in new_df.columns:
-                        new_df[date_col] = pd.to_datetime(new_df[date_col], errors='coerce')
-                
-                update_data(new_df) 
-                
-                st.success("Tracker database has been populated successfully.")
-                st.rerun() 
-                
-            except Exception as e:
-                st.error(f"Error processing file for DB population: {e}")
-                st.warning("Ensure the uploaded file is a valid Excel (.xlsx) file.")
+
+    tracker_editor(tracker, filters, total)
+
+
+@st.fragment
+def tracker_editor(tracker: ValidationTracker, filters: Dict, total: int):
+    """Pager and editor; cell edits rerun only this fragment."""
+    col_save, col_sort, col_order, col_size, col_page = st.columns(5)
+    sort_label = col_sort.selectbox("Sort by", list(tracker.SORT_OPTIONS), key="tracker_sort")
+    descending = col_order.toggle("Descending", key="tracker_descending")
+    page_size = col_size.selectbox("Rows per page", tracker.PAGE_SIZES, key="tracker_page_size")
+
+    pages = max(1, math.ceil(total / page_size))
+    if st.session_state.get("tracker_page", 1) > pages:
+        st.session_state["tracker_page"] = pages
+    page = col_page.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="tracker_page")
+
+    sort_by = tracker.SORT_OPTIONS[sort_label]
+    page_df = tracker.page(filters, page, page_size, sort_by, descending)
+    page_key = repr((sorted((k, str(v)) for k, v in filters.items()), sort_by, descending, page_size, page))
+    tracker.edit_page(page_df, page_key)
+
+    pending = len(st.session_state.get("tracker_pending", {}))
+    if pending > 1:
+        st.caption(f"Unsaved edits on {pending} pages")
+
+    with col_save:
+        show_flash("tracker_save")
+        if st.button("📋 Save changes", key="tracker_save_btn") and tracker.save_pending():
+            # Metrics and backup depend on the saved data: refresh the whole page
+            st.rerun()
+
+
+@st.fragment
+def tracker_data_panel():
+    """Sidebar import and history panel; reruns independently of the editor."""
+    st.header("Project Tracker Data Management")
+    job = session_job("tracker_import")
+    if job is not None and job.finished:
+        from excel_import import ImportValidationError
+
+        forget_job("tracker_import")
+        if job.status == "done":
+            result = job.result
+            message = f"Tracker database has been updated: {result['inserted']} added, {result['updated']} updated."
+            if result["ignored_columns"]:
+                message += f" Ignored columns: {', '.join(result['ignored_columns'])}"
+            st.success(message)
+        elif job.status == "cancelled":
+            st.info("Import cancelled, nothing was changed.")
+        elif isinstance(job.error, ImportValidationError):
+            st.error("Import rolled back, nothing was changed:\n\n" + "\n".join(f"- {err}" for err in job.error.errors))
+        else:
+            st.error(f"Error processing file for DB population: {job.error}")
+            st.warning("Ensure the uploaded file is a valid Excel (.xlsx) file.")
+
+    uploaded_file = st.file_uploader("Choose an Excel file to Populate DB", type="xlsx", key="tracker_uploader")
+
+    # The uploader keeps its file across reruns: import each upload only once
+    if uploaded_file and st.session_state.get("tracker_imported_file") != uploaded_file.file_id:
+        st.session_state["tracker_imported_file"] = uploaded_file.file_id
+        from excel_import import import_workbook
+
+        submit_job(
+            "tracker_import", "import", import_workbook, uploaded_file,
+            key=uploaded_file.file_id, label=f"Importing {uploaded_file.name}",
+        )
+
+    if session_job("tracker_import") is not None:
+        # Imports run in the background; the page reruns once this one is done
+        job_progress("tracker_import")
+
+    with st.expander("🕓 Homologation history"):
+        history_request = st.text_input("Request ID", key="tracker_history_request")
+        if history_request:
+            history = request_history(history_request.strip())
+            if history.empty:
+                st.caption("No recorded changes for this request.")
+            else:
+                st.dataframe(history[["ChangedAt", "OldValue", "NewValue", "Source"]], hide_index=True)
 
 def display_validation_checker():
+    from validation_check import ValidationChecker
+
     validation_checker=ValidationChecker()
     validation_checker.run()
 
 def display_project_report():
+    from report_form import HomologationApp
+
     report_form=HomologationApp()
     report_form.display_form()
 
+def display_dashboard():
+    from dashboard import display_dashboard as show_dashboard
+
+    show_dashboard()
+
 def run_app():
-    tab1, tab2, tab3 = st.tabs([
-        "🚧 Validation Tracker",
-        "🔌 Validation Planner",
-        " ⏳Report generation"
-    ])
-    with tab1:
-        display_project_tracker()
-    with tab2:
-        display_validation_checker()
-    with tab3:
-        display_project_report()
+    # Only the selected page runs on a rerun, unlike st.tabs which runs all three
+    page = st.navigation(
+        [
+            st.Page(display_project_tracker, title="Validation Tracker", icon="🚧", url_path="tracker", default=True),
+            st.Page(display_validation_checker, title="Validation Planner", icon="🔌", url_path="planner"),
+            st.Page(display_project_report, title="Report generation", icon="⏳", url_path="report"),
+            st.Page(display_dashboard, title="Dashboard", icon="📊", url_path="dashboard"),
+        ],
+        position="top",
+    )
+    if is_admin():
+        with st.sidebar:
+            profiling_panel()
+    page.run()
     
 
 
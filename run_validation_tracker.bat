@@ -11,6 +11,6 @@ REM Open browser to Streamlit local URL
 start "" http://localhost:8501
 
 REM Run Streamlit app inside WSL using venv
-wsl bash -c "cd '%WSL_DIR%' && source venv/bin/activate && export DB_PATH='%WSL_DIR%/TrackerSource/project_tracker.db' && streamlit run TrackerSource/validation_tracker.py --server.port 8501"
+wsl bash -c "cd '%WSL_DIR%' && source venv/bin/activate && export DB_PATH='%WSL_DIR%/project_tracker.db' && streamlit run TrackerSource/validation_tracker.py --server.port 8501"
 
 endlocal
\ No newline at end of file
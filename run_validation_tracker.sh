@@ -8,7 +8,7 @@ cd "$(dirname "$0")"
 source venv/bin/activate
 
 # Set database path for the app
-export DB_PATH="$(pwd)/TrackerSource/project_tracker.db"
+export DB_PATH="$(pwd)/project_tracker.db"
 
 # Open browser automatically
 xdg-open http://localhost:8501 &
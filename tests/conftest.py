@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app's modules are flat files in TrackerSource, imported by name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "TrackerSource"))
+
+
+@pytest.fixture
+def tracker_db(tmp_path, monkeypatch):
+    """An empty database at the latest schema, used by every default connection."""
+    import database
+
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "project_tracker.db"))
+    database.open_database.clear()
+    storage = database.get_connection_manager()
+    yield storage
+    storage.close()
+    database.open_database.clear()
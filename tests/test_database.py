@@ -0,0 +1,82 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import database
+from database import MIGRATIONS, HOMOLOGATION_OPTIONS, get_data_from_db, schema_version, search_tracker_query
+
+# The tracker as it was before the schema migrations; tests only open copies of it
+LEGACY_DB = Path(__file__).resolve().parent.parent / "project_tracker.db"
+
+
+@pytest.fixture
+def open_legacy(tmp_path, monkeypatch):
+    """Opens (and so migrates) a database file made by the caller, like the app would."""
+    opened = []
+
+    def open_legacy(path):
+        monkeypatch.setattr(database, "DB_NAME", str(path))
+        database.open_database.clear()
+        opened.append(database.get_connection_manager())
+        return opened[-1]
+
+    yield open_legacy
+    for storage in opened:
+        storage.close()
+    database.open_database.clear()
+
+
+def test_migrates_a_copy_of_the_legacy_tracker(tmp_path, open_legacy):
+    path = tmp_path / "project_tracker.db"
+    shutil.copy(LEGACY_DB, path)
+    with sqlite3.connect(LEGACY_DB) as conn:
+        # Request and Homologated come out trimmed
+        legacy = conn.execute(
+            "SELECT rowid, trim(Request), nullif(trim(Homologated), ''), Note FROM ValidationTracker ORDER BY rowid"
+        ).fetchall()
+    conn.close()
+
+    storage = open_legacy(path)
+    with storage.reader() as conn:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
+        migrated = conn.execute("SELECT ID, Request, Homologated, Note FROM ValidationTracker ORDER BY ID").fetchall()
+        assert conn.execute("SELECT count(*) FROM ValidationTracker_legacy").fetchone()[0] == len(legacy)
+        assert conn.execute("SELECT DISTINCT Version FROM ValidationTracker").fetchall() == [(1,)]
+    assert migrated == legacy
+
+
+def test_legacy_id_column_is_kept(tmp_path, open_legacy):
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE ValidationTracker (ID TEXT, Request TEXT, Priority TEXT, Homologated TEXT, Closed TEXT)")
+        conn.executemany(
+            "INSERT INTO ValidationTracker VALUES (?, ?, ?, ?, ?)",
+            [("A-7", "R-1", "2025-01-31", "✅ PASSED", None), ("A-7", "R-2", "ASAP", "Retired status", "2025-02-01")],
+        )
+    conn.close()
+
+    open_legacy(path)
+    rows = get_data_from_db("SELECT ID, LegacyID, Request, Priority, Homologated, Closed, Note FROM ValidationTracker ORDER BY ID")
+    assert rows.to_dict(orient="records") == [
+        {"ID": 1, "LegacyID": "A-7", "Request": "R-1", "Priority": "2025-01-31", "Homologated": "✅ PASSED", "Closed": None, "Note": None},
+        {"ID": 2, "LegacyID": "A-7", "Request": "R-2", "Priority": None, "Homologated": "Retired status", "Closed": "2025-02-01", "Note": "Priority: ASAP"},
+    ]
+
+
+def test_homologated_sorts_in_status_order(tracker_db):
+    statuses = ["✅ PASSED", "⏳AWAIT R&D", "❌ FAILED", "🛠️FUNCTION"]
+    with tracker_db.transaction(source="test") as conn:
+        conn.executemany(
+            "INSERT INTO ValidationTracker (Request, Homologated) VALUES (?, ?)",
+            [(f"R-{n}", status) for n, status in enumerate(statuses)],
+        )
+
+    query, params = search_tracker_query({}, sort_by="Homologated", limit=10)
+    assert list(get_data_from_db(query, params)["Homologated"]) == sorted(statuses, key=HOMOLOGATION_OPTIONS.index)
+
+    query, params = search_tracker_query({}, sort_by="Homologated", descending=True, limit=10)
+    assert list(get_data_from_db(query, params)["Homologated"]) == sorted(
+        statuses, key=HOMOLOGATION_OPTIONS.index, reverse=True
+    )
@@ -0,0 +1,34 @@
+import streamlit as st
+
+from drafts import load_draft, save_draft
+from report_form import HomologationApp, comparison_skeleton
+
+COMPONENTS = ("Component_1", "Component_2")
+
+
+def test_report_tables_survive_reopening(tracker_db):
+    skeleton = comparison_skeleton("MOSFET", "materiales", COMPONENTS)
+    rows = skeleton.assign(Component_1="ALU", Component_2="CU").to_dict(orient="records")
+    draft_id, _, _ = save_draft("report", {"doc_id": "H-1", "product_type": "MOSFET", "materiales": rows})
+
+    loaded, _ = load_draft(draft_id)
+    assert loaded["materiales"] == rows
+    assert list(loaded["materiales"][0]) == ["Field", *COMPONENTS]
+
+    st.session_state.clear()
+    app = HomologationApp()
+    app.open_draft(loaded)
+    frame = app.table_seed("materiales", skeleton)
+    assert frame.to_dict(orient="records") == rows
+
+
+def test_table_seed_accepts_rows_in_another_column_order(tracker_db):
+    skeleton = comparison_skeleton("MOSFET", "materiales", COMPONENTS)
+    rows = [{"Component_2": "CU", "Field": field, "Component_1": "ALU"} for field in skeleton["Field"]]
+
+    st.session_state.clear()
+    app = HomologationApp()
+    app.open_draft({"materiales": rows})
+    frame = app.table_seed("materiales", skeleton)
+    assert list(frame.columns) == ["Field", *COMPONENTS]
+    assert set(frame["Component_1"]) == {"ALU"}
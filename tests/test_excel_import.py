@@ -0,0 +1,55 @@
+import pytest
+
+from database import StaleRevisionError, get_data_from_db, table_revision
+from excel_import import ImportValidationError, import_records
+
+LOAD = "SELECT ID, Request, Product, New, Note, Version FROM ValidationTracker ORDER BY ID"
+
+
+@pytest.fixture
+def seeded(tracker_db):
+    import_records([
+        {"Request": "R-1", "Product": "CRS-2000", "New": "IPP050", "Note": "first"},
+        {"Request": "R-1", "Product": "ODS-3000", "New": "IPP050", "Note": "second"},
+    ])
+    return tracker_db
+
+
+def test_rows_are_matched_by_id(seeded):
+    result = import_records([{"ID": 2, "Request": "R-1", "Product": "ODX-1300", "Note": "moved"}])
+    assert result == {"rows": 1, "inserted": 0, "updated": 1, "ignored_columns": []}
+
+    rows = get_data_from_db(LOAD).set_index("ID")
+    assert rows.loc[2, ["Product", "New", "Note", "Version"]].tolist() == ["ODX-1300", "IPP050", "moved", 2]
+    assert rows.loc[1, "Note"] == "first"
+
+
+def test_rows_without_id_are_matched_by_request_product_and_new(seeded):
+    result = import_records([
+        {"Request": " R-1 ", "Product": "ODS-3000", "New": "IPP050", "Note": "updated", "Owner": "QA"},
+        {"Request": "R-1", "Product": "ODS-3000", "New": "IPP057", "Note": "other component"},
+    ])
+    assert result == {"rows": 2, "inserted": 1, "updated": 1, "ignored_columns": ["Owner"]}
+
+    rows = get_data_from_db(LOAD)
+    assert rows[["ID", "New", "Note"]].values.tolist() == [
+        [1, "IPP050", "first"],
+        [2, "IPP050", "updated"],
+        [3, "IPP057", "other component"],
+    ]
+
+
+def test_reimporting_the_same_rows_changes_nothing(seeded):
+    revision = table_revision()
+    rows = get_data_from_db(LOAD).drop(columns="Version").to_dict(orient="records")
+    assert import_records(rows)["updated"] == 0
+    assert table_revision() == revision
+
+
+def test_invalid_or_stale_imports_write_nothing(seeded):
+    before = get_data_from_db(LOAD)
+    with pytest.raises(ImportValidationError):
+        import_records([{"ID": 1, "Request": "R-1", "Note": "ok"}, {"ID": "x", "Request": "R-9"}])
+    with pytest.raises(StaleRevisionError):
+        import_records([{"ID": 1, "Request": "R-1", "Note": "late"}], expected_revision=table_revision() - 1)
+    assert get_data_from_db(LOAD).equals(before)
@@ -0,0 +1,17 @@
+import os
+
+from startup_report import BASELINE_MODULES, DEFAULT_BUDGET, eager_modules, measure_imports
+
+# Slower machines (CI) can allow more time with STARTUP_BUDGET=<seconds>
+BUDGET = float(os.environ.get("STARTUP_BUDGET", DEFAULT_BUDGET))
+
+
+def test_cold_start_within_budget():
+    seconds, _ = measure_imports()
+    assert seconds <= BUDGET, f"import took {seconds:.2f}s, budget {BUDGET:.2f}s (see startup_report.py)"
+
+
+def test_heavy_modules_deferred():
+    _, imports = measure_imports()
+    _, baseline_imports = measure_imports(BASELINE_MODULES)
+    assert eager_modules(imports, baseline_imports) == []
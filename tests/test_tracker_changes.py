@@ -0,0 +1,60 @@
+from database import apply_changes, get_data_from_db
+from tracker_diff import diff_frames
+
+LOAD = "SELECT * FROM ValidationTracker ORDER BY ID"
+
+
+def seed(storage):
+    with storage.transaction(source="test") as conn:
+        conn.executemany(
+            "INSERT INTO ValidationTracker (Request, Product, Note) VALUES (?, ?, ?)",
+            [("R-1", "CRS-2000", "first"), ("R-1", "ODS-3000", None), ("R-2", "CRS-2000", "third")],
+        )
+
+
+def test_diff_frames_finds_inserts_updates_and_deletes(tracker_db):
+    seed(tracker_db)
+    original = get_data_from_db(LOAD)
+    edited = original.copy()
+    edited.loc[edited["ID"] == 1, "Note"] = "edited"
+    edited = edited[edited["ID"] != 3]
+    edited.loc[len(edited)] = {"Request": "R-3", "Product": "ODX-1300"}
+
+    changes = diff_frames(original, edited)
+    assert changes.updates == {1: {"Note": ("first", "edited")}}
+    assert changes.deletes == [3]
+    assert [(row["Request"], row["Product"]) for row in changes.inserts] == [("R-3", "ODX-1300")]
+    assert changes.versions == {1: 1, 3: 1}
+
+    assert apply_changes(changes) == []
+    rows = get_data_from_db(LOAD)
+    assert list(rows["Request"]) == ["R-1", "R-1", "R-3"]
+    assert rows.set_index("ID").loc[1, ["Note", "Version"]].tolist() == ["edited", 2]
+
+
+def test_unchanged_rows_make_an_empty_change_set(tracker_db):
+    seed(tracker_db)
+    original = get_data_from_db(LOAD)
+    assert diff_frames(original, original.copy()).is_empty()
+
+
+def test_stale_version_is_reported_as_a_conflict(tracker_db):
+    seed(tracker_db)
+    mine = get_data_from_db(LOAD)
+    theirs = mine.copy()
+
+    theirs.loc[theirs["ID"] == 1, "Note"] = "theirs"
+    assert apply_changes(diff_frames(mine, theirs)) == []
+
+    edited = mine.copy()
+    edited.loc[edited["ID"] == 1, "Note"] = "mine"
+    edited.loc[edited["ID"] == 2, "Note"] = "mine too"
+    assert apply_changes(diff_frames(mine, edited)) == [1]
+
+    notes = get_data_from_db(LOAD).set_index("ID")["Note"]
+    assert notes[1] == "theirs"
+    assert notes[2] == "mine too"
+
+    # Deleting the row someone else changed is refused the same way
+    assert apply_changes(diff_frames(mine, mine[mine["ID"] != 1])) == [1]
+    assert 1 in set(get_data_from_db(LOAD)["ID"])